@@ -0,0 +1,146 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+
+from app.utils.helpers import to_paise, line_total, format_paise, format_currency
+
+class CartModel(QAbstractTableModel):
+    """
+    The bill being built on the billing screen. Items are the same dicts
+    BillModel.create_bill() takes (product_id, product_name, quantity, unit,
+    price and total in paise).
+
+    Rows are found by product id through an index instead of a scan, edits
+    and repeated scans update one row with dataChanged, and the subtotal is
+    adjusted by each change rather than summed again, so the 200th line
+    costs the same as the first.
+    """
+    COLUMNS = ["Product", "Qty", "Unit", "Price", "Total"]
+    QTY, UNIT, PRICE, TOTAL = 1, 2, 3, 4
+
+    totals_changed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.items = []
+        self.row_of = {} # product id -> the row repeated scans add to
+        self.subtotal = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.items)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return None
+        item = self.items[index.row()]
+        column = index.column()
+        if column == 0:
+            return item['product_name']
+        if column == self.QTY:
+            return str(item['quantity'])
+        if column == self.UNIT:
+            return item['unit']
+        if column == self.PRICE:
+            return format_paise(item['price'])
+        return format_currency(item['total'])
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if index.column() in (self.QTY, self.UNIT, self.PRICE):
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role != Qt.ItemDataRole.EditRole:
+            return False
+        item = self.items[index.row()]
+        try:
+            if index.column() == self.QTY:
+                item['quantity'] = float(value)
+            elif index.column() == self.UNIT:
+                item['unit'] = value
+            elif index.column() == self.PRICE:
+                # to_paise strips a currency symbol if present
+                item['price'] = to_paise(value)
+            else:
+                return False
+        except ValueError:
+            return False # Ignore invalid input
+        self._set_total(index.row(), line_total(item['quantity'], item['price']))
+        return True
+
+    def add(self, product, qty):
+        """Add qty of a product, to its existing line if it has one"""
+        row = self.row_of.get(product['id'])
+        if row is not None:
+            item = self.items[row]
+            item['quantity'] += qty
+            self._set_total(row, line_total(item['quantity'], item['price']))
+            return
+        self.row_of[product['id']] = len(self.items)
+        self._append(self._line(product, qty, line_total(qty, product['price_per_unit'])))
+        self.totals_changed.emit()
+
+    def add_line(self, product, qty, total=None):
+        """
+        Add a line of its own, e.g. a weighed pack whose label fixes the
+        total. It is marked 'weighed' so later scans never merge into it.
+        """
+        if total is None:
+            total = line_total(qty, product['price_per_unit'])
+        item = self._line(product, qty, total)
+        item['weighed'] = True
+        self._append(item)
+        self.totals_changed.emit()
+
+    def load(self, items):
+        """Replace the cart, e.g. with the items of a resumed held bill"""
+        self.beginResetModel()
+        self.items = list(items)
+        self.row_of = {}
+        for row, item in enumerate(self.items):
+            # Held bills come back from the database without the 'weighed'
+            # mark; a total that is not qty x price still gives a label away
+            if item.get('weighed') or item['total'] != line_total(item['quantity'], item['price']):
+                continue
+            self.row_of.setdefault(item['product_id'], row)
+        self.subtotal = sum(item['total'] for item in self.items)
+        self.endResetModel()
+        self.totals_changed.emit()
+
+    def clear(self):
+        self.load([])
+
+    @staticmethod
+    def _line(product, qty, total):
+        return {
+            'product_id': product['id'],
+            'product_name': product['name'],
+            'quantity': qty,
+            'unit': product['base_unit'],
+            'price': product['price_per_unit'],
+            'total': total
+        }
+
+    def _append(self, item):
+        row = len(self.items)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.items.append(item)
+        self.subtotal += item['total']
+        self.endInsertRows()
+
+    def _set_total(self, row, total):
+        item = self.items[row]
+        self.subtotal += total - item['total']
+        item['total'] = total
+        self.dataChanged.emit(self.index(row, self.QTY), self.index(row, self.TOTAL))
+        self.totals_changed.emit()
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,123 @@
+class CatalogIndex:
+    """
+    In-memory product lookup for the billing screen: products by id, plus
+    product ids by code and by lowercase name, so resolving a scan or a
+    completer pick is a constant-time lookup instead of a walk over every
+    product. Extra barcodes from product_barcodes map to (product id, pack
+    quantity).
+
+    Built once with load() and kept current with apply(), which takes the
+    (action, payload) change lists that ProductModel publishes.
+    """
+    def __init__(self, products=None, barcodes=None):
+        self.by_id = {}
+        self.by_code = {}
+        self.by_name = {}
+        self.by_barcode = {}
+        self.barcodes_of = {} # product id -> its extra barcodes
+        if products:
+            self.load(products, barcodes)
+
+    def load(self, products, barcodes=None):
+        self.by_id.clear()
+        self.by_code.clear()
+        self.by_name.clear()
+        self.by_barcode.clear()
+        self.barcodes_of.clear()
+        for product in products:
+            self.add(product)
+        for barcode in barcodes or []:
+            self.add_barcode(barcode)
+
+    def add(self, product):
+        """Insert or replace a product"""
+        old = self.by_id.get(product['id'])
+        self.by_id[product['id']] = product
+        if old is not None:
+            self._unlink(old, product)
+        code = product.get('code')
+        if code:
+            self.by_code.setdefault(code, product['id'])
+        self.by_name.setdefault(product['name'].lower(), product['id'])
+
+    def remove(self, product_id):
+        product = self.by_id.pop(product_id, None)
+        if product is not None:
+            self._unlink(product)
+        self.set_barcodes(product_id, [])
+
+    def add_barcode(self, barcode):
+        self.by_barcode[barcode['barcode']] = (barcode['product_id'], barcode['pack_qty'])
+        self.barcodes_of.setdefault(barcode['product_id'], []).append(barcode)
+
+    def set_barcodes(self, product_id, barcodes):
+        for old in self.barcodes_of.pop(product_id, []):
+            self.by_barcode.pop(old['barcode'], None)
+        for barcode in barcodes:
+            self.add_barcode(barcode)
+
+    def _unlink(self, old, new=None):
+        # Release the keys of an old version of a product that the new version
+        # (if any) no longer has; another product sharing the key takes over
+        code = old.get('code')
+        if code and (new is None or new.get('code') != code):
+            self._release(self.by_code, code, old['id'], lambda p: p.get('code') == code)
+        name = old['name'].lower()
+        if new is None or new['name'].lower() != name:
+            self._release(self.by_name, name, old['id'], lambda p: p['name'].lower() == name)
+
+    def _release(self, index, key, product_id, matches):
+        if index.get(key) != product_id:
+            return
+        del index[key]
+        # Only deletes and renames get here, so looking for a product that
+        # shares the key with a scan is acceptable
+        for other in self.by_id.values():
+            if other['id'] != product_id and matches(other):
+                index[key] = other['id']
+                break
+
+    def apply(self, changes):
+        for action, payload in changes:
+            if action == 'deleted':
+                self.remove(payload['id'])
+            elif action == 'barcodes':
+                self.set_barcodes(payload['product_id'], payload['barcodes'])
+            else:
+                self.add(payload)
+
+    def get(self, product_id):
+        return self.by_id.get(product_id)
+
+    def find(self, text):
+        """Product whose code or (case-insensitive) name is exactly text, or None"""
+        text = text.strip()
+        product_id = self.by_code.get(text)
+        if product_id is None:
+            product_id = self.by_name.get(text.lower())
+        return self.by_id.get(product_id)
+
+    def find_by_code(self, code):
+        return self.by_id.get(self.by_code.get(code))
+
+    def lookup(self, code):
+        """(product, pack_qty) for a product code or extra barcode, or (None, 1)"""
+        code = code.strip()
+        product_id = self.by_code.get(code)
+        if product_id is not None:
+            return self.by_id.get(product_id), 1
+        product_id, pack_qty = self.by_barcode.get(code, (None, 1))
+        return self.by_id.get(product_id), pack_qty
+
+    def find_by_plu(self, plu):
+        """Product for a scale label PLU: the code as printed, or without its zero padding"""
+        product = self.find_by_code(plu)
+        if product is None:
+            product = self.find_by_code(plu.lstrip('0') or '0')
+        return product
+
+    def products(self):
+        return list(self.by_id.values())
+
+    def __len__(self):
+        return len(self.by_id)
@@ -0,0 +1,55 @@
+"""
+Export of the dashboard charts to an image or PDF file through matplotlib.
+
+matplotlib is optional: it is only imported when an export is requested,
+and export_charts() raises ImportError if it is not installed.
+"""
+from app.utils.helpers import to_rupees
+
+def plot_sales(ax, data):
+    dates = list(data.keys())
+    totals = [to_rupees(t) for t in data.values()]
+
+    # Simple sorting by date
+    sorted_pairs = sorted(zip(dates, totals))
+    if sorted_pairs:
+        dates, totals = zip(*sorted_pairs)
+
+    ax.bar(dates, totals, color='#4CAF50')
+    ax.set_title("Sales Trends")
+    ax.set_ylabel("Sales (₹)")
+
+    # Rotate dates if many
+    if len(dates) > 5:
+        ax.tick_params(axis='x', rotation=45)
+
+def plot_top_products(ax, data):
+    names = [item['name'][:15] + '..' if len(item['name']) > 15 else item['name'] for item in data]
+    qtys = [item['qty'] for item in data]
+
+    # Invert to have top most at top
+    ax.barh(names[::-1], qtys[::-1], color='#2196F3')
+    ax.set_title("Top Selling Products")
+    ax.set_xlabel("Quantity Sold")
+
+def plot_payment_dist(ax, data):
+    labels = [d['method'] for d in data]
+    sizes = [d['total'] for d in data]
+
+    if sizes:
+        ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=['#FFC107', '#9C27B0', '#F44336'])
+        ax.set_title("Payment Methods (By Value)")
+    else:
+        ax.text(0.5, 0.5, 'No Data', ha='center', va='center')
+
+def export_charts(filename, sales, top_products, payments):
+    """Write the three dashboard charts to filename; the format follows its extension (.png, .pdf, .svg)"""
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=(15, 5), dpi=100)
+    grid = figure.add_gridspec(1, 3, width_ratios=[2, 1, 1])
+    plot_sales(figure.add_subplot(grid[0]), sales)
+    plot_top_products(figure.add_subplot(grid[1]), top_products)
+    plot_payment_dist(figure.add_subplot(grid[2]), payments)
+    figure.tight_layout()
+    figure.savefig(filename)
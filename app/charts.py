@@ -0,0 +1,258 @@
+import math
+
+from PyQt6.QtWidgets import QWidget, QToolTip, QSizePolicy
+from PyQt6.QtCore import Qt, QPointF, QRectF
+from PyQt6.QtGui import QPainter, QPainterPath, QColor, QPen, QFontMetrics
+
+PIE_COLORS = ['#FFC107', '#9C27B0', '#F44336', '#4CAF50', '#2196F3', '#FF5722', '#607D8B']
+
+def nice_ceiling(value):
+    """Smallest 1, 2, 2.5 or 5 x 10^n at or above value, for axis maxima"""
+    if value <= 0:
+        return 1
+    magnitude = 10 ** math.floor(math.log10(value))
+    for step in (1, 2, 2.5, 5, 10):
+        if value <= step * magnitude:
+            return step * magnitude
+    return 10 * magnitude
+
+class ChartWidget(QWidget):
+    """
+    Base for the dashboard charts: a title, a list of (label, value) points
+    and hover tooltips. Subclasses draw the points in paint_chart() and record
+    a hit region per point in self.regions while doing so.
+
+    Points can be replaced wholesale with set_data() or changed one at a time
+    with set_value()/add_value(); either way only a repaint follows, which
+    takes a few milliseconds.
+    """
+    def __init__(self, title='', color='#4CAF50', value_format=None, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.color = QColor(color)
+        self.value_format = value_format or (lambda v: f"{v:,.2f}")
+        self.labels = []
+        self.values = []
+        self.index = {} # label -> position
+        self.regions = [] # (QRectF or QPainterPath, position), rebuilt on paint
+        self.hovered = None
+        self.setMouseTracking(True)
+        self.setMinimumSize(200, 150)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+
+    def set_data(self, labels, values):
+        self.labels = list(labels)
+        self.values = list(values)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.hovered = None
+        self.update()
+
+    def set_value(self, label, value):
+        """Change one point, appending it if the label is new"""
+        i = self.index.get(label)
+        if i is None:
+            self.index[label] = len(self.labels)
+            self.labels.append(label)
+            self.values.append(value)
+        else:
+            self.values[i] = value
+        self.update()
+
+    def add_value(self, label, delta):
+        i = self.index.get(label)
+        self.set_value(label, delta if i is None else self.values[i] + delta)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        rect = QRectF(self.rect()).adjusted(8, 8, -8, -8)
+        if self.title:
+            font = painter.font()
+            font.setBold(True)
+            painter.setFont(font)
+            height = QFontMetrics(font).height()
+            painter.drawText(QRectF(rect.left(), rect.top(), rect.width(), height),
+                             Qt.AlignmentFlag.AlignCenter, self.title)
+            font.setBold(False)
+            painter.setFont(font)
+            rect.setTop(rect.top() + height + 8)
+        self.regions = []
+        if not self.values or not any(self.values):
+            painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, "No Data")
+        else:
+            self.paint_chart(painter, rect)
+        painter.end()
+
+    def paint_chart(self, painter, rect):
+        raise NotImplementedError
+
+    def fill_for(self, i, color=None):
+        color = QColor(color or self.color)
+        return color.lighter(130) if i == self.hovered else color
+
+    def tooltip(self, i):
+        return f"{self.labels[i]}: {self.value_format(self.values[i])}"
+
+    def point_at(self, pos):
+        for region, i in self.regions:
+            if region.contains(pos):
+                return i
+        return None
+
+    def mouseMoveEvent(self, event):
+        i = self.point_at(event.position())
+        if i != self.hovered:
+            self.hovered = i
+            self.update()
+        if i is None:
+            QToolTip.hideText()
+        else:
+            QToolTip.showText(event.globalPosition().toPoint(), self.tooltip(i), self)
+
+    def leaveEvent(self, event):
+        self.hovered = None
+        self.update()
+        super().leaveEvent(event)
+
+class _AxisChart(ChartWidget):
+    """Shared value axis for the bar and line charts"""
+    TICKS = 4
+
+    def axis_max(self):
+        return nice_ceiling(max(max(self.values), 0))
+
+    def draw_value_axis(self, painter, rect, metrics):
+        """Draw horizontal grid lines with their values; returns the plot area"""
+        top = self.axis_max()
+        ticks = [top * k / self.TICKS for k in range(self.TICKS + 1)]
+        texts = [f"{t:,.0f}" if top >= 10 else f"{t:g}" for t in ticks]
+        label_width = max(metrics.horizontalAdvance(text) for text in texts)
+        plot = QRectF(rect.left() + label_width + 6, rect.top() + metrics.height() / 2,
+                      rect.width() - label_width - 6, rect.height() - metrics.height() * 2.5)
+        for k, text in enumerate(texts):
+            y = plot.bottom() - plot.height() * k / self.TICKS
+            painter.setPen(QPen(QColor('#DDDDDD')))
+            painter.drawLine(QPointF(plot.left(), y), QPointF(plot.right(), y))
+            painter.setPen(self.palette().text().color())
+            painter.drawText(QRectF(rect.left(), y - metrics.height() / 2, label_width, metrics.height()),
+                             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, text)
+        return plot
+
+    def draw_category_labels(self, painter, plot, metrics, centers):
+        """Labels under the plot, skipping some when they would overlap"""
+        widest = max(metrics.horizontalAdvance(label) for label in self.labels) + 6
+        slot = plot.width() / len(self.labels)
+        every = max(1, math.ceil(widest / slot))
+        painter.setPen(self.palette().text().color())
+        for i in range(0, len(self.labels), every):
+            painter.drawText(QRectF(centers[i] - widest / 2, plot.bottom() + 4, widest, metrics.height()),
+                             Qt.AlignmentFlag.AlignCenter, self.labels[i])
+
+class BarChart(_AxisChart):
+    def paint_chart(self, painter, rect):
+        metrics = QFontMetrics(painter.font())
+        plot = self.draw_value_axis(painter, rect, metrics)
+        top = self.axis_max()
+        slot = plot.width() / len(self.values)
+        centers = []
+        painter.setPen(Qt.PenStyle.NoPen)
+        for i, value in enumerate(self.values):
+            height = plot.height() * max(value, 0) / top
+            bar = QRectF(plot.left() + slot * (i + 0.15), plot.bottom() - height, slot * 0.7, height)
+            painter.setBrush(self.fill_for(i))
+            painter.drawRect(bar)
+            # The whole column is hoverable, so short bars are easy to point at
+            self.regions.append((QRectF(plot.left() + slot * i, plot.top(), slot, plot.height()), i))
+            centers.append(bar.center().x())
+        self.draw_category_labels(painter, plot, metrics, centers)
+
+class LineChart(_AxisChart):
+    def paint_chart(self, painter, rect):
+        metrics = QFontMetrics(painter.font())
+        plot = self.draw_value_axis(painter, rect, metrics)
+        top = self.axis_max()
+        step = plot.width() / max(len(self.values) - 1, 1)
+        points = [QPointF(plot.left() + step * i if len(self.values) > 1 else plot.center().x(),
+                          plot.bottom() - plot.height() * max(v, 0) / top)
+                  for i, v in enumerate(self.values)]
+        painter.setPen(QPen(self.color, 2))
+        painter.drawPolyline(points)
+        painter.setPen(Qt.PenStyle.NoPen)
+        for i, point in enumerate(points):
+            radius = 5 if i == self.hovered else 3
+            painter.setBrush(self.fill_for(i))
+            painter.drawEllipse(point, radius, radius)
+            self.regions.append((QRectF(point.x() - step / 2, plot.top(), max(step, 8), plot.height()), i))
+        self.draw_category_labels(painter, plot, metrics, [p.x() for p in points])
+
+class HBarChart(ChartWidget):
+    """Horizontal bars, first point at the top, with the value after each bar"""
+    def paint_chart(self, painter, rect):
+        metrics = QFontMetrics(painter.font())
+        label_width = min(max(metrics.horizontalAdvance(label) for label in self.labels), rect.width() * 0.4)
+        value_width = max(metrics.horizontalAdvance(self.value_format(v)) for v in self.values) + 6
+        left = rect.left() + label_width + 6
+        span = max(rect.width() - label_width - 6 - value_width, 1)
+        top = max(max(self.values), 0) or 1
+        slot = rect.height() / len(self.values)
+        text_color = self.palette().text().color()
+        for i, value in enumerate(self.values):
+            y = rect.top() + slot * i
+            painter.setPen(text_color)
+            painter.drawText(QRectF(rect.left(), y, label_width, slot),
+                             Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                             metrics.elidedText(self.labels[i], Qt.TextElideMode.ElideRight, int(label_width)))
+            width = span * max(value, 0) / top
+            bar = QRectF(left, y + slot * 0.15, width, slot * 0.7)
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(self.fill_for(i))
+            painter.drawRect(bar)
+            painter.setPen(text_color)
+            painter.drawText(QRectF(bar.right() + 4, y, value_width, slot),
+                             Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, self.value_format(value))
+            self.regions.append((QRectF(rect.left(), y, rect.width(), slot), i))
+
+class PieChart(ChartWidget):
+    """Slices by share of the total, with a legend of percentages beside the pie"""
+    def __init__(self, title='', colors=None, value_format=None, parent=None):
+        super().__init__(title, value_format=value_format, parent=parent)
+        self.colors = colors or PIE_COLORS
+
+    def color_for(self, i):
+        return self.colors[i % len(self.colors)]
+
+    def tooltip(self, i):
+        total = sum(v for v in self.values if v > 0)
+        return f"{super().tooltip(i)} ({self.values[i] / total:.1%})"
+
+    def paint_chart(self, painter, rect):
+        metrics = QFontMetrics(painter.font())
+        total = sum(v for v in self.values if v > 0)
+        legend_width = max(metrics.horizontalAdvance(f"{label} 100.0%") for label in self.labels) + 20
+        diameter = max(min(rect.height(), rect.width() - legend_width - 10), 20)
+        pie = QRectF(rect.left(), rect.center().y() - diameter / 2, diameter, diameter)
+        angle = 90.0 # start at 12 o'clock, going clockwise
+        painter.setPen(QPen(self.palette().base().color(), 1))
+        for i, value in enumerate(self.values):
+            if value <= 0:
+                continue
+            sweep = -360.0 * value / total
+            path = QPainterPath(pie.center())
+            path.arcTo(pie, angle, sweep)
+            path.closeSubpath()
+            painter.setBrush(self.fill_for(i, self.color_for(i)))
+            painter.drawPath(path)
+            self.regions.append((path, i))
+            angle += sweep
+
+        x = pie.right() + 10
+        y = rect.center().y() - len(self.values) * metrics.height() / 2
+        for i, value in enumerate(self.values):
+            painter.setPen(Qt.PenStyle.NoPen)
+            painter.setBrush(QColor(self.color_for(i)))
+            painter.drawRect(QRectF(x, y + 3, 10, metrics.height() - 6))
+            painter.setPen(self.palette().text().color())
+            share = value / total if total and value > 0 else 0
+            painter.drawText(QPointF(x + 14, y + metrics.ascent()), f"{self.labels[i]} {share:.1%}")
+            self.regions.append((QRectF(x, y, legend_width, metrics.height()), i))
+            y += metrics.height()
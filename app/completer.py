@@ -0,0 +1,246 @@
+import heapq
+from bisect import bisect_left, insort
+
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt6.QtWidgets import QCompleter
+
+def trigrams(term):
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+def prefix_terms(code, name):
+    """Terms a short query can be a prefix of: the code, the name and each later word of the name"""
+    return {code, name, *name.split()[1:]} - {''}
+
+class CompletionIndex:
+    """
+    Ranked search over completer entries. Each entry has a key, the text
+    shown in the popup, a code (product code, barcode or phone) and a name,
+    plus a weight such as how often it was sold.
+
+    Queries of one or two characters match code, name and word prefixes
+    through a sorted term list; longer ones match substrings through a trigram index.
+    Only the best `limit` matches are returned: exact code, exact name, code
+    prefix, name prefix, word prefix, then any substring, heavier entries
+    first within each tier. Entries are added and removed one at a time, so
+    the index follows catalog changes without a rebuild.
+    """
+    BROAD = 500 # prefix matches ranked in full; beyond this only ones with weight
+
+    def __init__(self):
+        self.entries = {} # key -> (display, code, name, words)
+        self.weights = {}
+        self.terms = [] # sorted (term, key) for prefix lookups, see prefix_terms()
+        self.by_trigram = {}
+
+    def clear(self):
+        self.entries.clear()
+        self.weights.clear()
+        self.terms.clear()
+        self.by_trigram.clear()
+
+    def add(self, key, display, code='', name='', weight=None):
+        """Insert or replace an entry; weight defaults to the one the key already has"""
+        self.remove(key, keep_weight=True)
+        for term in self._index(key, display, code, name, weight):
+            insort(self.terms, (term, key))
+
+    def add_many(self, rows):
+        """Bulk load (key, display, code, name, weight) rows into an empty index, sorting once"""
+        for key, display, code, name, weight in rows:
+            self.terms.extend((term, key) for term in self._index(key, display, code, name, weight))
+        self.terms.sort()
+
+    def _index(self, key, display, code, name, weight):
+        code, name = (code or '').lower(), (name or '').lower()
+        self.entries[key] = (display, code, name, name.split())
+        if weight is not None or key not in self.weights:
+            self.weights[key] = weight or 0
+        for term in {code, name} - {''}:
+            for gram in trigrams(term):
+                self.by_trigram.setdefault(gram, set()).add(key)
+        return prefix_terms(code, name)
+
+    def remove(self, key, keep_weight=False):
+        entry = self.entries.pop(key, None)
+        if not keep_weight:
+            self.weights.pop(key, None)
+        if entry is None:
+            return
+        _, code, name, _ = entry
+        for term in prefix_terms(code, name):
+            i = bisect_left(self.terms, (term, key))
+            if i < len(self.terms) and self.terms[i] == (term, key):
+                del self.terms[i]
+        for term in {code, name} - {''}:
+            for gram in trigrams(term):
+                keys = self.by_trigram.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.by_trigram[gram]
+
+    def bump(self, key, amount=1):
+        if key in self.entries:
+            self.weights[key] = self.weights.get(key, 0) + amount
+
+    def search(self, text, limit=20):
+        """Display strings of the best matches for text, best first"""
+        query = text.strip().lower()
+        if not query or limit <= 0:
+            return []
+        if len(query) < 3:
+            candidates = self._with_prefix(query)
+        else:
+            candidates = self._containing(query)
+        rank, weights = self._rank, self.weights
+        ranked = heapq.nsmallest(limit, (rank(key, query, weights) for key in candidates))
+        return [display for _, _, display in ranked]
+
+    def _with_prefix(self, query):
+        start = bisect_left(self.terms, (query,))
+        end = bisect_left(self.terms, (query + '\uffff',))
+        matches = self.terms[start:end]
+        if len(matches) <= self.BROAD:
+            return {key for _, key in matches}
+        # A one-letter query can match most of the catalog; ranking it all
+        # would lag, so take the alphabetically first few plus everything
+        # that has sold
+        weights = self.weights
+        keys = {key for _, key in matches[:self.BROAD]}
+        keys.update(key for _, key in matches if weights[key])
+        return keys
+
+    def _containing(self, query):
+        postings = sorted((self.by_trigram.get(gram, set()) for gram in trigrams(query)), key=len)
+        keys = postings[0].intersection(*postings[1:]) if postings else set()
+        # Every trigram present does not make a substring ("abcxbcd" has those of "abcd")
+        entries = self.entries
+        return [k for k in keys if query in entries[k][1] or query in entries[k][2]]
+
+    def _rank(self, key, query, weights):
+        display, code, name, words = self.entries[key]
+        if code == query:
+            tier = 0
+        elif name == query:
+            tier = 1
+        elif code.startswith(query):
+            tier = 2
+        elif name.startswith(query):
+            tier = 3
+        elif any(word.startswith(query) for word in words):
+            tier = 4
+        else:
+            tier = 5
+        return tier, -weights[key], display
+
+    def __len__(self):
+        return len(self.entries)
+
+class ProductCompletions(CompletionIndex):
+    """Completer entries "Name (code)" for a CatalogIndex: one per product, one per extra barcode"""
+    def __init__(self):
+        super().__init__()
+        self.barcode_keys = {} # product id -> keys of its barcode entries
+
+    def clear(self):
+        super().clear()
+        self.barcode_keys.clear()
+
+    def load(self, catalog, sales=None):
+        """sales: product id -> how often it sells, e.g. BillModel.get_product_sale_days()"""
+        self.clear()
+        sales = sales or {}
+        rows = []
+        for product in catalog.products():
+            weight = sales.get(product['id'], 0)
+            rows.append((('product', product['id']), f"{product['name']} ({product['code']})",
+                         product['code'], product['name'], weight))
+            keys = []
+            for barcode in catalog.barcodes_of.get(product['id'], []):
+                key = ('barcode', barcode['barcode'])
+                rows.append((key, f"{product['name']} ({barcode['barcode']})", barcode['barcode'], '', weight))
+                keys.append(key)
+            if keys:
+                self.barcode_keys[product['id']] = keys
+        self.add_many(rows)
+
+    def add_product(self, catalog, product, weight=None):
+        self.add(('product', product['id']), f"{product['name']} ({product['code']})",
+                 product['code'], product['name'], weight)
+        self.set_barcodes(catalog, product['id'])
+
+    def set_barcodes(self, catalog, product_id):
+        for key in self.barcode_keys.pop(product_id, []):
+            self.remove(key)
+        product = catalog.get(product_id)
+        if product is None:
+            return
+        weight = self.weights.get(('product', product_id), 0)
+        keys = []
+        for barcode in catalog.barcodes_of.get(product_id, []):
+            # Barcode entries match on the barcode only, so a name search lists the product once
+            key = ('barcode', barcode['barcode'])
+            self.add(key, f"{product['name']} ({barcode['barcode']})", barcode['barcode'], '', weight)
+            keys.append(key)
+        if keys:
+            self.barcode_keys[product_id] = keys
+
+    def apply(self, catalog, changes):
+        """Follow ProductModel changes, after catalog.apply(changes)"""
+        for action, payload in changes:
+            if action == 'deleted':
+                self.remove(('product', payload['id']))
+                self.set_barcodes(catalog, payload['id'])
+            elif action == 'barcodes':
+                self.set_barcodes(catalog, payload['product_id'])
+            else:
+                product = catalog.get(payload['id'])
+                if product is not None:
+                    self.add_product(catalog, product)
+
+    def record_sale(self, product_id):
+        for key in [('product', product_id)] + self.barcode_keys.get(product_id, []):
+            self.bump(key)
+
+class RankedCompleterModel(QAbstractListModel):
+    """The current top matches of a CompletionIndex, for an unfiltered QCompleter popup"""
+    def __init__(self, index, limit=20, parent=None):
+        super().__init__(parent)
+        self.index_ = index
+        self.limit = limit
+        self.matches = []
+
+    def set_query(self, text):
+        self.beginResetModel()
+        self.matches = self.index_.search(text, self.limit)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.matches)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid() and role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self.matches[index.row()]
+        return None
+
+def attach_ranked_completer(line_edit, index, limit=20):
+    """
+    A completer popup on line_edit showing the top matches from index. The
+    line edit does not own the completer (QCompleter would filter the rows
+    again on every keystroke); the popup is refreshed on textEdited instead.
+    Connect the returned completer's activated signal to handle a pick.
+    """
+    model = RankedCompleterModel(index, limit, line_edit)
+    completer = QCompleter(model, line_edit)
+    completer.setWidget(line_edit)
+    completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+
+    def refresh(text):
+        model.set_query(text)
+        if model.rowCount():
+            completer.complete()
+        else:
+            completer.popup().hide()
+
+    line_edit.textEdited.connect(refresh)
+    return completer
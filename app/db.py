@@ -1,12 +1,58 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import declarative_base, sessionmaker
+from contextlib import contextmanager
 import os
 import sys
 import shutil
+import sqlite3
+import threading
 
 Base = declarative_base()
 
+# Named SQLite tuning profiles, selected with the 'db_profile' setting.
+# journal_mode is stored in the database file; the other pragmas apply per connection.
+DB_PROFILES = {
+    'Balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -16000,  # negative means KiB, so ~16 MB of page cache
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'Performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'Safe': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'cache_size': -8000,
+        'mmap_size': 0,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,
+    },
+    # For databases kept on network shares, where WAL is not supported
+    'Compatibility': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'cache_size': -2000,
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT',
+        'busy_timeout': 10000,
+    },
+}
+DEFAULT_DB_PROFILE = 'Balanced'
+
 def get_db_path():
+    # Explicit override, e.g. to point scripts and benchmarks at a scratch database
+    if os.environ.get('THANGAM_DB_PATH'):
+        return os.path.abspath(os.environ['THANGAM_DB_PATH'])
+
     if getattr(sys, 'frozen', False):
         # Running as compiled executable
         # Use a 'data' folder next to the executable for persistence
@@ -33,15 +79,122 @@ def get_db_path():
         # Running from source
         return os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'thangam.db')
 
+def _read_db_profile(dbapi_connection):
+    """Read the configured profile name straight from the settings table."""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("SELECT value FROM settings WHERE key = 'db_profile'")
+        row = cursor.fetchone()
+        return row[0] if row and row[0] in DB_PROFILES else DEFAULT_DB_PROFILE
+    except sqlite3.Error:
+        # Settings table does not exist yet (fresh database)
+        return DEFAULT_DB_PROFILE
+    finally:
+        cursor.close()
+
+def apply_db_profile(dbapi_connection, profile_name=None):
+    """Apply the pragmas of a profile to a raw sqlite3 connection."""
+    profile = DB_PROFILES[profile_name or _read_db_profile(dbapi_connection)]
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+        cursor.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+        cursor.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        cursor.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+        cursor.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+        cursor.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+    finally:
+        cursor.close()
+
 DB_PATH = get_db_path()
 engine = create_engine(f'sqlite:///{DB_PATH}', echo=False)
 Session = sessionmaker(bind=engine)
 
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    # Disable pysqlite's own transaction handling so BEGIN is emitted below;
+    # otherwise DDL in migrations would autocommit statement by statement.
+    dbapi_connection.isolation_level = None
+    apply_db_profile(dbapi_connection)
+
+@event.listens_for(engine, "begin")
+def _on_begin(conn):
+    conn.info['changes_at_begin'] = conn.connection.total_changes
+    conn.exec_driver_sql("BEGIN")
+
+# Counts committed transactions that changed rows, so cached query results
+# (app.query_cache) can tell whether they were read from current data.
+_data_version = 0
+_commits = threading.local() # whether this thread's last COMMIT wrote rows
+
+def data_version():
+    return _data_version
+
+def note_committed_writes():
+    """
+    Bump the data version if the COMMIT that just ran on this thread changed
+    rows. Called from the Session after_commit hook (app.models) before
+    listeners are notified, so queries they run see the new version.
+    """
+    global _data_version
+    if getattr(_commits, 'wrote', False):
+        _commits.wrote = False
+        _data_version += 1
+
+@event.listens_for(engine, "commit")
+def _on_commit(conn):
+    if conn.connection.total_changes != conn.info.pop('changes_at_begin', None):
+        conn.info['wrote'] = True
+        _commits.wrote = True
+
+@event.listens_for(engine, "checkin")
+def _on_checkin(dbapi_connection, connection_record):
+    # Backstop for commits made outside a Session, e.g. engine.begin() in
+    # migrations. Not bumped on "commit", which fires before COMMIT runs: a
+    # query started in between would otherwise cache old rows as current
+    global _data_version
+    if connection_record is not None and connection_record.info.pop('wrote', False):
+        _data_version += 1
+
 def get_db():
     return Session()
 
+@contextmanager
+def session_scope(session=None):
+    """
+    Unit of work for the model layer.
+
+    Without a session, opens one, commits it when the block ends, rolls back
+    on error and closes it. Given a caller's session, runs the block in a
+    SAVEPOINT on it instead, so a failing call only undoes its own changes
+    and the caller decides when to commit. Batch several model calls with:
+
+        with session_scope() as session:
+            BillModel.mark_bill_as_paid(bill_id, session=session)
+            ...
+    """
+    if session is not None:
+        with session.begin_nested():
+            yield session
+        return
+
+    session = get_db()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
 def init_db():
     # Ensure directory exists (redundant for frozen path but good for source)
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    
+    # Register all tables before create_all, then bring older files up to date
+    import app.orm_models  # noqa: F401
+    from app.migrations import run_migrations
     Base.metadata.create_all(engine)
+    run_migrations(engine)
 
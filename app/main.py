@@ -1,24 +1,30 @@
+import time
+STARTED_AT = time.perf_counter() # before the imports, which are a large part of startup
+
 import sys
 import os
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
 from app.db import init_db
 from app.ui_main import MainWindow
 from app.utils.logger import app_logger
 
 from app.ui_styles import get_theme_style
-from app.models import SettingsModel
+from app.models import SettingsModel, BillModel
 
 def main():
     try:
         # Initialize Database
         init_db()
+        SettingsModel.load()
         app_logger.info("Database initialized.")
 
         # Start App
         app = QApplication(sys.argv)
         
         theme = SettingsModel.get_setting('theme', 'Light')
-        app.setStyleSheet(get_theme_style(theme))
+        touch_mode = SettingsModel.get_bool('touch_mode', False)
+        app.setStyleSheet(get_theme_style(theme, touch_mode))
         
         # Apply Theme (Optional: Dark Mode or Custom Styles)
         app.setStyle("Fusion")
@@ -26,7 +32,11 @@ def main():
         window = MainWindow()
         window.show()
         
-        app_logger.info("Application started.")
+        # Runs once the event loop has started, i.e. after the first paint
+        QTimer.singleShot(0, lambda: app_logger.info(
+            f"Application started in {time.perf_counter() - STARTED_AT:.2f} s."))
+        app.aboutToQuit.connect(lambda: app_logger.info(
+            "Analytics cache: {hits} hits, {misses} misses".format(**BillModel.analytics_cache.stats())))
         sys.exit(app.exec())
     except Exception as e:
         app_logger.critical(f"Application failed to start: {e}")
@@ -0,0 +1,303 @@
+"""
+Versioned schema migrations.
+
+The schema version is kept in SQLite's PRAGMA user_version. init_db() runs
+create_all first (which only creates missing tables) and then every migration
+newer than the stored version, each in its own transaction. Migrations must
+be idempotent because a brand new database starts at version 0 even though
+create_all already gave it the latest tables.
+"""
+import sqlite3
+
+from sqlalchemy.exc import OperationalError
+
+from app.utils.helpers import normalize_phone
+from app.utils.logger import app_logger
+
+
+def _columns(conn, table):
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+def _add_column(conn, table, column, ddl):
+    if column not in _columns(conn, table):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+def _create_index(conn, name, table, columns, unique=False):
+    unique_sql = "UNIQUE " if unique else ""
+    conn.exec_driver_sql(
+        f"CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"
+    )
+
+def _column_type(conn, table, column):
+    for row in conn.exec_driver_sql(f"PRAGMA table_info({table})"):
+        if row[1] == column:
+            return row[2].upper()
+    return None
+
+def _rebuild_table(conn, table, create_sql, select_sql):
+    """
+    Replace a table with a new definition (SQLite cannot change column types
+    in place). create_sql must create '{table}_new'; select_sql reads the rows
+    to copy from the old table. Indexes must be recreated by the caller.
+    """
+    conn.exec_driver_sql(create_sql)
+    conn.exec_driver_sql(f"INSERT INTO {table}_new {select_sql}")
+    conn.exec_driver_sql(f"DROP TABLE {table}")
+    conn.exec_driver_sql(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+def _v1_hot_path_indexes(conn):
+    # Single-column lookups. bills.status, bills.payment_method and
+    # bills.customer_id are served by the composite indexes below, which
+    # lead with those columns.
+    _create_index(conn, 'ix_bills_date_time', 'bills', ['date_time'])
+    _create_index(conn, 'ix_bill_items_bill_id', 'bill_items', ['bill_id'])
+    _create_index(conn, 'ix_bill_items_product_id', 'bill_items', ['product_id'])
+    _create_index(conn, 'ix_products_code', 'products', ['code'])
+
+    # Trends and held bills: status = ? [AND date_time >= ?]
+    _create_index(conn, 'ix_bills_status_date_time', 'bills', ['status', 'date_time'])
+    # Debt screens: payment_method = 'Debt' AND status != 'PAID'
+    _create_index(conn, 'ix_bills_payment_method_status', 'bills', ['payment_method', 'status'])
+    # Per-customer debt: customer_id = ? AND payment_method = 'Debt' AND status != 'PAID'
+    _create_index(conn, 'ix_bills_customer_debt', 'bills', ['customer_id', 'payment_method', 'status'])
+
+
+def _v2_bill_time_keys(conn):
+    _add_column(conn, 'bills', 'created_ts', 'INTEGER')
+    _add_column(conn, 'bills', 'business_date', 'VARCHAR(10)')
+    # date_time is local time; the 'utc' modifier converts it like datetime.timestamp() does
+    conn.exec_driver_sql(
+        "UPDATE bills SET "
+        "created_ts = CAST(strftime('%s', date_time, 'utc') AS INTEGER), "
+        "business_date = substr(date_time, 1, 10) "
+        "WHERE created_ts IS NULL OR business_date IS NULL"
+    )
+
+    # Period queries now go through business_date / created_ts instead of the string
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_bills_date_time")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS ix_bills_status_date_time")
+    _create_index(conn, 'ix_bills_created_ts', 'bills', ['created_ts'])
+    _create_index(conn, 'ix_bills_business_date', 'bills', ['business_date'])
+    _create_index(conn, 'ix_bills_status_business_date', 'bills', ['status', 'business_date'])
+
+
+def _paise(column):
+    return f"CAST(ROUND({column} * 100) AS INTEGER)"
+
+def _v3_integer_paise(conn):
+    # Money columns become INTEGER paise. A REAL column would turn stored
+    # integers back into floats, so the tables are rebuilt rather than updated.
+    if _column_type(conn, 'products', 'price_per_unit') != 'INTEGER':
+        _rebuild_table(conn, 'products', """
+            CREATE TABLE products_new (
+                id INTEGER NOT NULL,
+                name VARCHAR NOT NULL,
+                code VARCHAR,
+                base_unit VARCHAR NOT NULL,
+                price_per_unit INTEGER NOT NULL,
+                category VARCHAR,
+                PRIMARY KEY (id)
+            )""", f"""
+            SELECT id, name, code, base_unit, {_paise('price_per_unit')}, category
+            FROM products""")
+        _create_index(conn, 'ix_products_code', 'products', ['code'])
+
+    if _column_type(conn, 'bills', 'grand_total') != 'INTEGER':
+        _rebuild_table(conn, 'bills', """
+            CREATE TABLE bills_new (
+                id INTEGER NOT NULL,
+                bill_number VARCHAR NOT NULL,
+                customer_id INTEGER,
+                date_time VARCHAR NOT NULL,
+                created_ts INTEGER,
+                business_date VARCHAR(10),
+                subtotal INTEGER NOT NULL,
+                tax_percent FLOAT,
+                tax_amount INTEGER,
+                discount_amount INTEGER,
+                grand_total INTEGER NOT NULL,
+                payment_method VARCHAR,
+                status VARCHAR,
+                PRIMARY KEY (id),
+                UNIQUE (bill_number),
+                FOREIGN KEY(customer_id) REFERENCES customers (id)
+            )""", f"""
+            SELECT id, bill_number, customer_id, date_time, created_ts, business_date,
+                   {_paise('subtotal')}, tax_percent, {_paise('tax_amount')},
+                   {_paise('discount_amount')}, {_paise('grand_total')}, payment_method, status
+            FROM bills""")
+        _create_index(conn, 'ix_bills_created_ts', 'bills', ['created_ts'])
+        _create_index(conn, 'ix_bills_business_date', 'bills', ['business_date'])
+        _create_index(conn, 'ix_bills_status_business_date', 'bills', ['status', 'business_date'])
+        _create_index(conn, 'ix_bills_payment_method_status', 'bills', ['payment_method', 'status'])
+        _create_index(conn, 'ix_bills_customer_debt', 'bills', ['customer_id', 'payment_method', 'status'])
+
+    if _column_type(conn, 'bill_items', 'total') != 'INTEGER':
+        _rebuild_table(conn, 'bill_items', """
+            CREATE TABLE bill_items_new (
+                id INTEGER NOT NULL,
+                bill_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                product_name VARCHAR NOT NULL,
+                quantity FLOAT NOT NULL,
+                unit VARCHAR NOT NULL,
+                price INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                PRIMARY KEY (id),
+                FOREIGN KEY(bill_id) REFERENCES bills (id),
+                FOREIGN KEY(product_id) REFERENCES products (id)
+            )""", f"""
+            SELECT id, bill_id, product_id, product_name, quantity, unit,
+                   {_paise('price')}, {_paise('total')}
+            FROM bill_items""")
+        _create_index(conn, 'ix_bill_items_bill_id', 'bill_items', ['bill_id'])
+        _create_index(conn, 'ix_bill_items_product_id', 'bill_items', ['product_id'])
+
+
+def _v4_daily_sales(conn):
+    # The table itself comes from create_all; fill it from existing bills
+    conn.exec_driver_sql("DELETE FROM daily_sales")
+    conn.exec_driver_sql(
+        "INSERT INTO daily_sales (business_date, payment_method, bill_count, total) "
+        "SELECT business_date, COALESCE(payment_method, 'Unknown'), COUNT(id), SUM(grand_total) "
+        "FROM bills WHERE status = 'PAID' "
+        "GROUP BY business_date, COALESCE(payment_method, 'Unknown')"
+    )
+
+
+def _v5_product_sales_daily(conn):
+    # The table itself comes from create_all; fill it from existing bills
+    conn.exec_driver_sql("DELETE FROM product_sales_daily")
+    conn.exec_driver_sql(
+        "INSERT INTO product_sales_daily (product_id, business_date, product_name, quantity, revenue) "
+        "SELECT bi.product_id, b.business_date, MAX(bi.product_name), SUM(bi.quantity), SUM(bi.total) "
+        "FROM bill_items bi JOIN bills b ON b.id = bi.bill_id "
+        "WHERE b.status = 'PAID' "
+        "GROUP BY bi.product_id, b.business_date"
+    )
+
+
+def _v6_customer_ledger(conn):
+    # customer_ledger itself comes from create_all
+    _add_column(conn, 'customers', 'balance', 'INTEGER NOT NULL DEFAULT 0')
+    _add_column(conn, 'bills', 'amount_paid', 'INTEGER NOT NULL DEFAULT 0')
+    _create_index(conn, 'ix_customers_balance', 'customers', ['balance'])
+    _create_index(conn, 'ix_customer_ledger_customer_id', 'customer_ledger', ['customer_id', 'id'])
+
+    # Open the ledger with one debit per outstanding Debt bill, oldest first
+    conn.exec_driver_sql("DELETE FROM customer_ledger")
+    conn.exec_driver_sql(
+        "INSERT INTO customer_ledger (customer_id, bill_id, date_time, entry_type, amount, balance_after, note) "
+        "SELECT customer_id, id, date_time, 'DEBIT', grand_total - amount_paid, "
+        "       SUM(grand_total - amount_paid) OVER (PARTITION BY customer_id ORDER BY id), "
+        "       'Bill ' || bill_number "
+        "FROM bills "
+        "WHERE customer_id IS NOT NULL AND payment_method = 'Debt' AND status != 'PAID' "
+        "ORDER BY id"
+    )
+    conn.exec_driver_sql(
+        "UPDATE customers SET balance = COALESCE(("
+        "  SELECT SUM(amount) FROM customer_ledger WHERE customer_ledger.customer_id = customers.id"
+        "), 0)"
+    )
+
+
+def fts5_available(conn):
+    """True if this SQLite build has FTS5 with the trigram tokenizer (3.34+)."""
+    if sqlite3.sqlite_version_info < (3, 34, 0):
+        return False
+    try:
+        conn.exec_driver_sql("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x, tokenize='trigram')")
+        conn.exec_driver_sql("DROP TABLE temp._fts5_probe")
+        return True
+    except OperationalError:
+        return False
+
+def _v7_product_search(conn):
+    # Serves name LIKE 'abc%' (LIKE is case-insensitive, so the index must be NOCASE)
+    _create_index(conn, 'ix_products_name_nocase', 'products', ['name COLLATE NOCASE'])
+
+    # Without FTS5 ProductModel.search_products falls back to LIKE queries
+    if not fts5_available(conn):
+        app_logger.info("SQLite FTS5 trigram tokenizer not available; product search uses LIKE")
+        return
+
+    # External-content table over products(name, code), kept in sync by triggers.
+    # The trigram tokenizer matches any substring of 3+ characters.
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        "name, code, content='products', content_rowid='id', tokenize='trigram')"
+    )
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, code) VALUES (new.id, new.name, new.code);
+        END""")
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, code) VALUES ('delete', old.id, old.name, old.code);
+        END""")
+    conn.exec_driver_sql("""
+        CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, code ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, code) VALUES ('delete', old.id, old.name, old.code);
+            INSERT INTO products_fts(rowid, name, code) VALUES (new.id, new.name, new.code);
+        END""")
+    conn.exec_driver_sql("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def _v8_customer_lookup_keys(conn):
+    _add_column(conn, 'customers', 'phone_normalized', 'VARCHAR')
+    _add_column(conn, 'customers', 'phone_reversed', 'VARCHAR')
+
+    # Normalisation lives in Python, so back-fill row by row. Numbers that
+    # only differed in formatting collapse to one key; later duplicates keep
+    # their phone but get no key, and are reported for cleanup.
+    seen = set()
+    rows = conn.exec_driver_sql("SELECT id, phone FROM customers ORDER BY id").fetchall()
+    for customer_id, phone in rows:
+        key = normalize_phone(phone)
+        if key in seen:
+            app_logger.warning(f"Customer {customer_id}: phone {phone!r} duplicates another customer's number")
+            key = None
+        if key:
+            seen.add(key)
+        conn.exec_driver_sql(
+            "UPDATE customers SET phone_normalized = ?, phone_reversed = ? WHERE id = ?",
+            (key, key[::-1] if key else None, customer_id)
+        )
+
+    _create_index(conn, 'ix_customers_phone_normalized', 'customers', ['phone_normalized'], unique=True)
+    _create_index(conn, 'ix_customers_phone_reversed', 'customers', ['phone_reversed'])
+    _create_index(conn, 'ix_customers_name_nocase', 'customers', ['name COLLATE NOCASE'])
+
+
+# (version, description, function) in the order they must be applied
+MIGRATIONS = [
+    (1, "Hot-path indexes on bills, bill_items and products", _v1_hot_path_indexes),
+    (2, "Indexed created_ts and business_date on bills", _v2_bill_time_keys),
+    (3, "Store money as integer paise", _v3_integer_paise),
+    (4, "Back-fill the daily_sales rollup", _v4_daily_sales),
+    (5, "Back-fill the product_sales_daily rollup", _v5_product_sales_daily),
+    (6, "Customer ledger and cached debt balances", _v6_customer_ledger),
+    (7, "FTS5 trigram index for product search", _v7_product_search),
+    (8, "Normalised phone and name lookup keys on customers", _v8_customer_lookup_keys),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+def run_migrations(engine):
+    """Apply every pending migration, one transaction per version."""
+    with engine.connect() as conn:
+        current = get_schema_version(conn)
+
+    for version, description, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+        app_logger.info(f"Applied schema migration {version}: {description}")
@@ -1,44 +1,238 @@
-from app.db import get_db
-from app.orm_models import Product, Customer, Bill, BillItem, Setting
-from sqlalchemy import or_
-from datetime import datetime
+from app.db import Session, session_scope, note_committed_writes
+from app.query_cache import QueryCache
+from app.orm_models import Product, ProductBarcode, Customer, Bill, BillItem, Setting, DailySales, ProductSalesDaily, CustomerLedger
+from app.utils.helpers import bill_time_keys, normalize_phone, BILL_DATETIME_FORMAT
+from app.utils.exceptions import ValidationError
+from app.utils.logger import error_logger
+from sqlalchemy import and_, or_, func, event, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime, timedelta
+import copy
+
+def _start_date(days):
+    """business_date string of N days ago"""
+    return (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+def _add_to_rollups(session, business_date, payment_method, grand_total, items, sign=1):
+    """Add (sign=1) or remove (sign=-1) a PAID bill and its item dicts from the sales rollups."""
+    stmt = sqlite_insert(DailySales).values(
+        business_date=business_date,
+        payment_method=payment_method or 'Unknown',
+        bill_count=sign,
+        total=sign * grand_total
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['business_date', 'payment_method'],
+        set_={
+            'bill_count': DailySales.bill_count + stmt.excluded.bill_count,
+            'total': DailySales.total + stmt.excluded.total
+        }
+    )
+    session.execute(stmt)
+
+    # One row per product, even if it appears on several lines
+    per_product = {}
+    for item in items:
+        row = per_product.setdefault(item['product_id'], {
+            'product_id': item['product_id'],
+            'business_date': business_date,
+            'product_name': item['product_name'],
+            'quantity': 0,
+            'revenue': 0
+        })
+        row['quantity'] += sign * item['quantity']
+        row['revenue'] += sign * item['total']
+    if per_product:
+        table = ProductSalesDaily.__table__
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['product_id', 'business_date'],
+            set_={
+                'product_name': stmt.excluded.product_name,
+                'quantity': table.c.quantity + stmt.excluded.quantity,
+                'revenue': table.c.revenue + stmt.excluded.revenue
+            }
+        )
+        session.execute(stmt, list(per_product.values()))
+
+def _insert_bill(session, bill_data, items, payment_method, status):
+    """
+    Insert a bill header and its lines with Core statements: one INSERT for the
+    header (id from lastrowid) and a single executemany for the items. Skips the
+    per-line ORM objects and identity-map bookkeeping of session.add. Returns
+    the header values including 'id'.
+    """
+    created_ts, business_date = bill_time_keys(bill_data['date_time'])
+    header = {
+        'bill_number': bill_data['bill_number'],
+        'customer_id': bill_data.get('customer_id'),
+        'date_time': bill_data['date_time'],
+        'created_ts': created_ts,
+        'business_date': business_date,
+        'subtotal': bill_data['subtotal'],
+        'tax_percent': bill_data.get('tax_percent', 0),
+        'tax_amount': bill_data.get('tax_amount', 0),
+        'discount_amount': bill_data.get('discount_amount', 0),
+        'grand_total': bill_data['grand_total'],
+        'payment_method': payment_method,
+        'status': status
+    }
+    result = session.execute(Bill.__table__.insert().values(**header))
+    header['id'] = result.inserted_primary_key[0]
+
+    if items:
+        session.execute(BillItem.__table__.insert(), [{
+            'bill_id': header['id'],
+            'product_id': item['product_id'],
+            'product_name': item['product_name'],
+            'quantity': item['quantity'],
+            'unit': item['unit'],
+            'price': item['price'],
+            'total': item['total']
+        } for item in items])
+    return header
+
+def _post_ledger_entry(session, customer_id, entry_type, amount, bill_id=None, note=None, date_time=None):
+    """Append a DEBIT or CREDIT to a customer's ledger and move their cached balance with it."""
+    delta = amount if entry_type == 'DEBIT' else -amount
+    session.query(Customer).filter(Customer.id == customer_id).update(
+        {Customer.balance: Customer.balance + delta}, synchronize_session=False
+    )
+    balance = session.query(Customer.balance).filter(Customer.id == customer_id).scalar()
+    session.add(CustomerLedger(
+        customer_id=customer_id,
+        bill_id=bill_id,
+        date_time=date_time or datetime.now().strftime(BILL_DATETIME_FORMAT),
+        entry_type=entry_type,
+        amount=amount,
+        balance_after=balance,
+        note=note
+    ))
+    return balance
+
+def _settle_bill(session, bill, amount):
+    """Apply part of a payment to a Debt bill; a fully settled bill becomes PAID and enters the rollups."""
+    bill.amount_paid = (bill.amount_paid or 0) + amount
+    if bill.amount_paid >= bill.grand_total:
+        bill.status = 'PAID'
+        _add_to_rollups(session, bill.business_date, bill.payment_method, bill.grand_total,
+                        [i.to_dict() for i in bill.items])
+        BillModel._changed(session, 'bill_paid', _bill_payload(bill))
+
+def _bill_payload(bill):
+    """A bill's dict with its business_date and item dicts, as carried by BillModel events"""
+    payload = bill.to_dict()
+    payload['business_date'] = bill.business_date
+    payload['items'] = [i.to_dict() for i in bill.items]
+    return payload
+
+def _like_escape(value):
+    """Escape LIKE wildcards so user input matches literally (with ESCAPE '\\')"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def _prefix_range(column, prefix):
+    """column starts with prefix, as a range that a BINARY index can seek"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+def _debt_outstanding(bill):
+    return bill.grand_total - (bill.amount_paid or 0)
 
 class ProductModel:
+    """
+    Product writes are announced to subscribers once they commit, as a list
+    of (action, payload) pairs. action is 'added', 'updated' or 'deleted'
+    with a product dict, or 'barcodes' with {'product_id', 'barcodes'} after
+    set_barcodes. In-memory indexes such as app.catalog use this to stay
+    current without reloading the catalog.
+    """
+    _fts = None # Whether products_fts exists, looked up on first search
+    _listeners = []
+
     @staticmethod
-    def add_product(name, code, base_unit, price, category="General"):
-        session = get_db()
-        try:
+    def subscribe(callback):
+        if callback not in ProductModel._listeners:
+            ProductModel._listeners.append(callback)
+
+    @staticmethod
+    def unsubscribe(callback):
+        if callback in ProductModel._listeners:
+            ProductModel._listeners.remove(callback)
+
+    @staticmethod
+    def _changed(session, action, payload):
+        session.flush()
+        session.info.setdefault('product_changes', []).append((action, payload))
+
+    @staticmethod
+    def add_product(name, code, base_unit, price, category="General", session=None):
+        with session_scope(session) as session:
             product = Product(name=name, code=code, base_unit=base_unit, price_per_unit=price, category=category)
             session.add(product)
-            session.commit()
+            session.flush() # assigns the id the event carries
+            ProductModel._changed(session, 'added', product.to_dict())
             return product.id
-        finally:
-            session.close()
 
     @staticmethod
-    def get_all_products():
-        session = get_db()
-        try:
+    def get_all_products(session=None):
+        with session_scope(session) as session:
             products = session.query(Product).all()
             return [p.to_dict() for p in products]
-        finally:
-            session.close()
 
     @staticmethod
-    def search_products(query):
-        session = get_db()
-        try:
-            products = session.query(Product).filter(
-                or_(Product.name.like(f'%{query}%'), Product.code.like(f'%{query}%'))
-            ).all()
-            return [p.to_dict() for p in products]
-        finally:
-            session.close()
+    def search_products(query, limit=50, session=None):
+        """
+        Products whose name or code contains query, best matches first: exact
+        code, then name prefix, then any substring. Each tier is an index seek
+        that stops at the limit; substrings come from the products_fts trigram
+        index when the database has one and from a LIKE scan otherwise.
+        """
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+        with session_scope(session) as session:
+            pattern = _like_escape(query)
+            results = {}
+
+            def take(products):
+                for p in products:
+                    if len(results) >= limit:
+                        break
+                    results.setdefault(p.id, p)
+
+            take(session.query(Product).filter(Product.code == query).limit(limit))
+            if len(results) < limit:
+                # Walks ix_products_name_nocase in order
+                take(session.query(Product).filter(
+                    Product.name.like(f'{pattern}%', escape='\\')
+                ).order_by(Product.name.collate('NOCASE')).limit(limit))
+            # Trigrams need 3+ characters; shorter queries stop at prefixes
+            if len(results) < limit and len(query) >= 3:
+                wanted = limit + len(results)
+                if ProductModel._has_fts(session):
+                    take(session.query(Product).from_statement(text(
+                        "SELECT products.* FROM products_fts "
+                        "JOIN products ON products.id = products_fts.rowid "
+                        "WHERE products_fts MATCH :match LIMIT :limit"
+                    )).params(match='"' + query.replace('"', '""') + '"', limit=wanted))
+                else:
+                    take(session.query(Product).filter(
+                        or_(Product.name.like(f'%{pattern}%', escape='\\'),
+                            Product.code.like(f'%{pattern}%', escape='\\'))
+                    ).limit(wanted))
+            return [p.to_dict() for p in results.values()]
 
     @staticmethod
-    def update_product(product_id, name, code, base_unit, price, category):
-        session = get_db()
-        try:
+    def _has_fts(session):
+        if ProductModel._fts is None:
+            ProductModel._fts = session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'"
+            )).first() is not None
+        return ProductModel._fts
+
+    @staticmethod
+    def update_product(product_id, name, code, base_unit, price, category, session=None):
+        with session_scope(session) as session:
             product = session.query(Product).get(product_id)
             if product:
                 product.name = name
@@ -46,391 +240,693 @@ class ProductModel:
                 product.base_unit = base_unit
                 product.price_per_unit = price
                 product.category = category
-                session.commit()
-        finally:
-            session.close()
+                ProductModel._changed(session, 'updated', product.to_dict())
 
     @staticmethod
-    def delete_product(product_id):
-        session = get_db()
-        try:
+    def delete_product(product_id, session=None):
+        with session_scope(session) as session:
             product = session.query(Product).get(product_id)
             if product:
                 session.delete(product)
-                session.commit()
-        finally:
-            session.close()
+                ProductModel._changed(session, 'deleted', product.to_dict())
+
+    @staticmethod
+    def get_barcodes(product_id, session=None):
+        with session_scope(session) as session:
+            barcodes = session.query(ProductBarcode).filter(
+                ProductBarcode.product_id == product_id
+            ).order_by(ProductBarcode.id).all()
+            return [b.to_dict() for b in barcodes]
+
+    @staticmethod
+    def get_all_barcodes(session=None):
+        with session_scope(session) as session:
+            return [b.to_dict() for b in session.query(ProductBarcode).all()]
+
+    @staticmethod
+    def set_barcodes(product_id, barcodes, session=None):
+        """
+        Replace a product's extra barcodes with barcodes, a list of
+        (barcode, pack_qty) pairs. A barcode already used by another product
+        raises IntegrityError. One equal to a product code raises
+        ValidationError: codes are looked up first, so it could never be
+        scanned as this product.
+        """
+        with session_scope(session) as session:
+            if barcodes:
+                clash = session.query(Product).filter(Product.code.in_([b for b, _ in barcodes])).first()
+                if clash:
+                    owner = "this product" if clash.id == product_id else f"'{clash.name}'"
+                    raise ValidationError(f"Barcode {clash.code} is already the code of {owner}.")
+            session.query(ProductBarcode).filter(ProductBarcode.product_id == product_id).delete()
+            session.flush()
+            for barcode, pack_qty in barcodes:
+                session.add(ProductBarcode(barcode=barcode, product_id=product_id, pack_qty=pack_qty))
+            ProductModel._changed(session, 'barcodes', {
+                'product_id': product_id,
+                'barcodes': [{'barcode': b, 'product_id': product_id, 'pack_qty': q} for b, q in barcodes]
+            })
+
+    @staticmethod
+    def find_by_barcode(barcode, session=None):
+        """(product dict, pack_qty) for a product code or extra barcode, or (None, 1)"""
+        barcode = barcode.strip()
+        with session_scope(session) as session:
+            product = session.query(Product).filter(Product.code == barcode).first()
+            if product:
+                return product.to_dict(), 1
+            alias = session.query(ProductBarcode).filter(ProductBarcode.barcode == barcode).first()
+            if alias:
+                return alias.product.to_dict(), alias.pack_qty
+            return None, 1
 
 class CustomerModel:
+    """
+    Like ProductModel, customer writes are announced to subscribers once they
+    commit, as (action, customer dict) pairs with action 'added', 'updated'
+    or 'deleted', so the billing screen's completer can update one entry.
+    """
+    _listeners = []
+
+    @staticmethod
+    def subscribe(callback):
+        if callback not in CustomerModel._listeners:
+            CustomerModel._listeners.append(callback)
+
+    @staticmethod
+    def unsubscribe(callback):
+        if callback in CustomerModel._listeners:
+            CustomerModel._listeners.remove(callback)
+
+    @staticmethod
+    def _changed(session, action, payload):
+        session.flush()
+        session.info.setdefault('customer_changes', []).append((action, payload))
+
     @staticmethod
-    def add_customer(name, phone, address):
-        session = get_db()
+    def add_customer(name, phone, address, session=None):
         try:
-            customer = Customer(name=name, phone=phone, address=address)
-            session.add(customer)
-            session.commit()
-            return customer.id
+            with session_scope(session) as session:
+                customer = Customer(name=name, phone=phone, address=address)
+                session.add(customer)
+                session.flush()
+                CustomerModel._changed(session, 'added', customer.to_dict())
+                return customer.id
         except Exception:
-            session.rollback()
             return None
-        finally:
-            session.close()
 
     @staticmethod
-    def get_all_customers():
-        session = get_db()
-        try:
+    def get_all_customers(session=None):
+        with session_scope(session) as session:
             customers = session.query(Customer).all()
             return [c.to_dict() for c in customers]
-        finally:
-            session.close()
 
     @staticmethod
-    def search_customer(query):
-        session = get_db()
-        try:
-            customers = session.query(Customer).filter(
-                or_(Customer.name.like(f'%{query}%'), Customer.phone.like(f'%{query}%'))
-            ).all()
-            return [c.to_dict() for c in customers]
-        finally:
-            session.close()
+    def search_customer(query, limit=20, session=None):
+        """
+        Customers matching a phone number or name, best matches first.
+        Phone-like queries try the exact number, then numbers starting with
+        it, then numbers ending with it (cashiers type the last digits).
+        Name queries try the exact name, then the name prefix, both through
+        NOCASE indexes, and finally any substring of the name.
+        """
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+        with session_scope(session) as session:
+            results = {}
+
+            def take(customers):
+                for c in customers:
+                    if len(results) >= limit:
+                        break
+                    results.setdefault(c.id, c)
+
+            compact = query.replace(' ', '').replace('-', '').lstrip('+')
+            if compact.isdigit():
+                phone = normalize_phone(compact)
+                take(session.query(Customer).filter(Customer.phone_normalized == phone).limit(1))
+                if len(results) < limit:
+                    take(session.query(Customer).filter(
+                        _prefix_range(Customer.phone_normalized, phone)
+                    ).order_by(Customer.phone_normalized).limit(limit))
+                if len(results) < limit:
+                    take(session.query(Customer).filter(
+                        _prefix_range(Customer.phone_reversed, compact[::-1])
+                    ).order_by(Customer.phone_reversed).limit(limit))
+            else:
+                name = Customer.name.collate('NOCASE')
+                take(session.query(Customer).filter(name == query).limit(limit))
+                if len(results) < limit:
+                    take(session.query(Customer).filter(
+                        Customer.name.like(f'{_like_escape(query)}%', escape='\\')
+                    ).order_by(name).limit(limit))
+                if len(results) < limit:
+                    # Bounded scan; customer lists are small next to the catalog
+                    take(session.query(Customer).filter(
+                        Customer.name.like(f'%{_like_escape(query)}%', escape='\\')
+                    ).order_by(name).limit(limit + len(results)))
+            return [c.to_dict() for c in results.values()]
 
     @staticmethod
-    def update_customer(customer_id, name, phone, address):
-        session = get_db()
+    def get_by_phone(phone, session=None):
+        """Customer with this phone number in any formatting, or None"""
+        key = normalize_phone(phone)
+        if not key:
+            return None
+        with session_scope(session) as session:
+            customer = session.query(Customer).filter(Customer.phone_normalized == key).first()
+            return customer.to_dict() if customer else None
+
+    @staticmethod
+    def update_customer(customer_id, name, phone, address, session=None):
         try:
-            customer = session.query(Customer).get(customer_id)
-            if customer:
-                customer.name = name
-                customer.phone = phone
-                customer.address = address
-                session.commit()
-                return True
-            return False
+            with session_scope(session) as session:
+                customer = session.query(Customer).get(customer_id)
+                if customer:
+                    customer.name = name
+                    customer.phone = phone
+                    customer.address = address
+                    CustomerModel._changed(session, 'updated', customer.to_dict())
+                    return True
+                return False
         except Exception:
-            session.rollback()
             return False
-        finally:
-            session.close()
 
     @staticmethod
-    def delete_customer(customer_id):
-        session = get_db()
+    def delete_customer(customer_id, session=None):
         try:
-            customer = session.query(Customer).get(customer_id)
-            if customer:
-                session.delete(customer)
-                session.commit()
-                return True
-            return False
+            with session_scope(session) as session:
+                customer = session.query(Customer).get(customer_id)
+                if customer:
+                    session.query(CustomerLedger).filter(CustomerLedger.customer_id == customer_id).delete()
+                    session.delete(customer)
+                    CustomerModel._changed(session, 'deleted', customer.to_dict())
+                    return True
+                return False
         except Exception:
-            session.rollback()
             return False
-        finally:
-            session.close()
+
+    @staticmethod
+    def get_balance(customer_id, session=None):
+        """Outstanding debt of a customer in paise"""
+        with session_scope(session) as session:
+            balance = session.query(Customer.balance).filter(Customer.id == customer_id).scalar()
+            return balance or 0
+
+    @staticmethod
+    def get_ledger(customer_id, limit=100, session=None):
+        """Latest ledger entries of a customer, newest first"""
+        with session_scope(session) as session:
+            entries = session.query(CustomerLedger).filter(
+                CustomerLedger.customer_id == customer_id
+            ).order_by(CustomerLedger.id.desc()).limit(limit).all()
+            return [e.to_dict() for e in entries]
+
+    @staticmethod
+    def record_payment(customer_id, amount, note=None, session=None):
+        """
+        Credit a payment (paise) against a customer's debt. The amount is
+        applied to their unpaid Debt bills oldest first, so it may settle some
+        bills fully and one partially. Returns the new balance.
+        """
+        with session_scope(session) as session:
+            balance = session.query(Customer.balance).filter(Customer.id == customer_id).scalar()
+            if balance is None:
+                raise ValidationError("Customer not found")
+            if amount <= 0:
+                raise ValidationError("Payment amount must be positive")
+            if amount > balance:
+                raise ValidationError("Payment is more than the outstanding balance")
+
+            new_balance = _post_ledger_entry(session, customer_id, 'CREDIT', amount, note=note or 'Payment received')
+
+            remaining = amount
+            bills = session.query(Bill).filter(
+                Bill.customer_id == customer_id,
+                Bill.payment_method == 'Debt',
+                Bill.status != 'PAID'
+            ).order_by(Bill.id).all()
+            for bill in bills:
+                if remaining <= 0:
+                    break
+                applied = min(remaining, _debt_outstanding(bill))
+                _settle_bill(session, bill, applied)
+                remaining -= applied
+
+            return new_balance
+
+# Dashboard and debt screen queries; see BillModel.analytics_cache
+_analytics_cache = QueryCache(maxsize=64, ttl=60)
 
 class BillModel:
+    """
+    Bill writes are announced to subscribers once they commit, as a list of
+    (event, payload) pairs. event is 'bill_committed' (create_bill and
+    hold_bill), 'bill_paid' (a Debt bill fully settled) or 'bill_deleted',
+    with the bill dict plus its business_date and 'items'; or 'bills_cleared'
+    with None after delete_all_bills. Screens use this to apply one bill to
+    what they show instead of querying again.
+    """
+    _listeners = []
+    analytics_cache = _analytics_cache
+
     @staticmethod
-    def create_bill(bill_data, items):
-        session = get_db()
-        try:
-            bill = Bill(
-                bill_number=bill_data['bill_number'],
-                customer_id=bill_data.get('customer_id'),
-                date_time=bill_data['date_time'],
-                subtotal=bill_data['subtotal'],
-                tax_percent=bill_data.get('tax_percent', 0),
-                tax_amount=bill_data.get('tax_amount', 0),
-                discount_amount=bill_data.get('discount_amount', 0),
-                grand_total=bill_data['grand_total'],
-                payment_method=bill_data['payment_method']
-            )
-            session.add(bill)
-            session.flush() # Get ID
-
-            for item in items:
-                bill_item = BillItem(
-                    bill_id=bill.id,
-                    product_id=item['product_id'],
-                    product_name=item['product_name'],
-                    quantity=item['quantity'],
-                    unit=item['unit'],
-                    price=item['price'],
-                    total=item['total']
-                )
-                session.add(bill_item)
+    def subscribe(callback):
+        if callback not in BillModel._listeners:
+            BillModel._listeners.append(callback)
+
+    @staticmethod
+    def unsubscribe(callback):
+        if callback in BillModel._listeners:
+            BillModel._listeners.remove(callback)
+
+    @staticmethod
+    def _changed(session, event, payload):
+        session.info.setdefault('bill_changes', []).append((event, payload))
+
+    @staticmethod
+    def create_bill(bill_data, items, session=None):
+        with session_scope(session) as session:
+            payment_method = bill_data['payment_method']
+            # Debt bills stay unpaid until settled from the debt screens
+            status = bill_data.get('status', 'UNPAID' if payment_method == 'Debt' else 'PAID')
+            bill = _insert_bill(session, bill_data, items, payment_method, status)
             
-            session.commit()
-            return bill.id
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+            if status == 'PAID':
+                _add_to_rollups(session, bill['business_date'], payment_method, bill['grand_total'], items)
+            elif payment_method == 'Debt' and bill['customer_id']:
+                _post_ledger_entry(session, bill['customer_id'], 'DEBIT', bill['grand_total'],
+                                   bill_id=bill['id'], note=f"Bill {bill['bill_number']}", date_time=bill['date_time'])
+            
+            BillModel._changed(session, 'bill_committed', dict(bill, amount_paid=0, items=[dict(i) for i in items]))
+            return bill['id']
 
     @staticmethod
-    def get_recent_bills(limit=10):
-        session = get_db()
-        try:
+    def get_recent_bills(limit=10, session=None):
+        with session_scope(session) as session:
             bills = session.query(Bill).order_by(Bill.id.desc()).limit(limit).all()
             return [b.to_dict() for b in bills]
-        finally:
-            session.close()
 
     @staticmethod
-    def delete_all_bills():
-        session = get_db()
-        try:
+    def delete_all_bills(session=None):
+        with session_scope(session) as session:
             session.query(BillItem).delete()
             session.query(Bill).delete()
-            session.commit()
-        finally:
-            session.close()
+            session.query(DailySales).delete()
+            session.query(ProductSalesDaily).delete()
+            session.query(CustomerLedger).delete()
+            session.query(Customer).update({Customer.balance: 0}, synchronize_session=False)
+            BillModel._changed(session, 'bills_cleared', None)
 
     @staticmethod
-    def get_debt_bills():
+    def get_debt_bills(session=None):
         """Get all unpaid debt bills with customer info"""
-        session = get_db()
-        try:
+        with session_scope(session) as session:
             bills = session.query(Bill).filter(
                 Bill.payment_method == 'Debt',
                 Bill.status != 'PAID'
             ).order_by(Bill.id.desc()).all()
             return [b.to_dict() for b in bills]
-        finally:
-            session.close()
 
     @staticmethod
-    def get_debt_by_customer():
-        """Get total debt grouped by customer"""
-        session = get_db()
-        try:
-            from sqlalchemy import func
+    @_analytics_cache.cached
+    def get_debt_by_customer(session=None):
+        """Get outstanding debt per customer from the cached balances"""
+        with session_scope(session) as session:
+            bill_count = session.query(func.count(Bill.id)).filter(
+                Bill.customer_id == Customer.id,
+                Bill.payment_method == 'Debt',
+                Bill.status != 'PAID'
+            ).correlate(Customer).scalar_subquery()
             results = session.query(
                 Customer.id,
                 Customer.name,
                 Customer.phone,
-                func.sum(Bill.grand_total).label('total_debt'),
-                func.count(Bill.id).label('bill_count')
-            ).join(Customer, Bill.customer_id == Customer.id).filter(
-                Bill.payment_method == 'Debt',
-                Bill.status != 'PAID'
-            ).group_by(Customer.id, Customer.name, Customer.phone).all()
+                Customer.balance,
+                bill_count.label('bill_count')
+            ).filter(Customer.balance > 0).order_by(Customer.balance.desc()).all()
             
             return [{
                 'customer_id': r.id,
                 'customer_name': r.name,
                 'customer_phone': r.phone,
-                'total_debt': r.total_debt,
+                'total_debt': r.balance,
                 'bill_count': r.bill_count
             } for r in results]
-        finally:
-            session.close()
 
     @staticmethod
-    def mark_bill_as_paid(bill_id):
+    def mark_bill_as_paid(bill_id, session=None):
         """Mark a debt bill as paid"""
-        session = get_db()
         try:
-            bill = session.query(Bill).get(bill_id)
-            if bill:
-                bill.status = 'PAID'
-                session.commit()
-                return True
-            return False
+            with session_scope(session) as session:
+                bill = session.query(Bill).get(bill_id)
+                if bill:
+                    if bill.status != 'PAID':
+                        outstanding = _debt_outstanding(bill)
+                        if bill.payment_method == 'Debt' and bill.customer_id and outstanding > 0:
+                            _post_ledger_entry(session, bill.customer_id, 'CREDIT', outstanding,
+                                               bill_id=bill.id, note=f"Payment for bill {bill.bill_number}")
+                        _settle_bill(session, bill, outstanding)
+                    return True
+                return False
         except Exception:
-            session.rollback()
             return False
-        finally:
-            session.close()
 
     @staticmethod
-    def get_customer_debt_bills(customer_id):
+    def get_customer_debt_bills(customer_id, session=None):
         """Get all debt bills for a specific customer"""
-        session = get_db()
-        try:
+        with session_scope(session) as session:
             bills = session.query(Bill).filter(
                 Bill.customer_id == customer_id,
                 Bill.payment_method == 'Debt',
                 Bill.status != 'PAID'
             ).order_by(Bill.id.desc()).all()
             return [b.to_dict() for b in bills]
-        finally:
-            session.close()
 
     @staticmethod
-    def get_sales_trends(days=30):
+    @_analytics_cache.cached
+    def get_sales_trends(days=30, session=None):
         """Get daily sales sum for the last N days"""
-        session = get_db()
-        try:
-            from sqlalchemy import func
+        with session_scope(session) as session:
             from datetime import datetime, timedelta
             
             # Calculate start date
             start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
             
-            # SQLite specific: substr(date_time, 1, 10) extracts YYYY-MM-DD
+            # Reads at most (days x payment methods) rollup rows
             results = session.query(
-                func.substr(Bill.date_time, 1, 10).label('date'),
-                func.sum(Bill.grand_total).label('total')
+                DailySales.business_date.label('date'),
+                func.sum(DailySales.total).label('total')
             ).filter(
-                Bill.date_time >= start_date,
-                Bill.status == 'PAID'
+                DailySales.business_date >= start_date
             ).group_by(
-                func.substr(Bill.date_time, 1, 10)
+                DailySales.business_date
             ).all()
             
-            return {r.date: r.total for r in results}
-        finally:
-            session.close()
+            return {r.date: r.total for r in results if r.total}
 
     @staticmethod
-    def get_top_selling_products(limit=5):
-        """Get top selling products by quantity"""
-        session = get_db()
-        try:
-            from sqlalchemy import func, desc
-            results = session.query(
-                BillItem.product_name,
-                func.sum(BillItem.quantity).label('total_qty')
-            ).join(Bill).filter(
-                Bill.status == 'PAID'
-            ).group_by(
-                BillItem.product_name
+    @_analytics_cache.cached
+    def get_top_selling_products(limit=5, days=None, session=None):
+        """Get top selling products by quantity, optionally for the last N days"""
+        with session_scope(session) as session:
+            from sqlalchemy import desc
+            query = session.query(
+                ProductSalesDaily.product_id,
+                func.coalesce(func.max(Product.name), func.max(ProductSalesDaily.product_name)).label('name'),
+                func.sum(ProductSalesDaily.quantity).label('total_qty'),
+                func.sum(ProductSalesDaily.revenue).label('revenue')
+            ).outerjoin(Product, Product.id == ProductSalesDaily.product_id)
+            if days is not None:
+                query = query.filter(ProductSalesDaily.business_date >= _start_date(days))
+            results = query.group_by(
+                ProductSalesDaily.product_id
+            ).having(
+                func.sum(ProductSalesDaily.quantity) > 0
             ).order_by(
                 desc('total_qty')
             ).limit(limit).all()
             
-            return [{'name': r.product_name, 'qty': r.total_qty} for r in results]
-        finally:
-            session.close()
+            return [{'product_id': r.product_id, 'name': r.name, 'qty': r.total_qty, 'revenue': r.revenue} for r in results]
 
     @staticmethod
-    def get_payment_method_stats():
-        """Get distribution of payment methods"""
-        session = get_db()
-        try:
-            from sqlalchemy import func
+    def get_product_sale_days(days=90, session=None):
+        """{product_id: days with a sale in the last N days}, a unit-independent popularity measure"""
+        with session_scope(session) as session:
             results = session.query(
-                Bill.payment_method,
-                func.count(Bill.id).label('count'),
-                func.sum(Bill.grand_total).label('total')
+                ProductSalesDaily.product_id, func.count()
             ).filter(
-                Bill.status == 'PAID'
-            ).group_by(
-                Bill.payment_method
-            ).all()
+                ProductSalesDaily.business_date >= _start_date(days),
+                ProductSalesDaily.quantity > 0
+            ).group_by(ProductSalesDaily.product_id).all()
+            return dict(results)
+
+    @staticmethod
+    def get_customer_bill_counts(session=None):
+        """{customer_id: number of bills}"""
+        with session_scope(session) as session:
+            results = session.query(
+                Bill.customer_id, func.count(Bill.id)
+            ).filter(Bill.customer_id.isnot(None)).group_by(Bill.customer_id).all()
+            return dict(results)
+
+    @staticmethod
+    def get_slow_moving_products(days=30, limit=10, session=None):
+        """Get current products with the lowest quantity sold in the last N days, unsold ones first"""
+        with session_scope(session) as session:
+            sold = session.query(
+                ProductSalesDaily.product_id,
+                func.sum(ProductSalesDaily.quantity).label('qty'),
+                func.sum(ProductSalesDaily.revenue).label('revenue')
+            ).filter(
+                ProductSalesDaily.business_date >= _start_date(days)
+            ).group_by(ProductSalesDaily.product_id).subquery()
+            
+            results = session.query(
+                Product.id,
+                Product.name,
+                func.coalesce(sold.c.qty, 0).label('qty'),
+                func.coalesce(sold.c.revenue, 0).label('revenue')
+            ).outerjoin(
+                sold, sold.c.product_id == Product.id
+            ).order_by('qty', Product.name).limit(limit).all()
             
-            return [{'method': r.payment_method or 'Unknown', 'count': r.count, 'total': r.total} for r in results]
-        finally:
-            session.close()
+            return [{'product_id': r.id, 'name': r.name, 'qty': r.qty, 'revenue': r.revenue} for r in results]
 
     @staticmethod
-    def hold_bill(bill_data, items):
-        """Save bill with status 'HELD'"""
-        session = get_db()
-        try:
-            bill = Bill(
-                bill_number=bill_data['bill_number'],
-                customer_id=bill_data.get('customer_id'),
-                date_time=bill_data['date_time'],
-                subtotal=bill_data['subtotal'],
-                tax_percent=bill_data.get('tax_percent', 0),
-                tax_amount=bill_data.get('tax_amount', 0),
-                discount_amount=bill_data.get('discount_amount', 0),
-                grand_total=bill_data['grand_total'],
-                payment_method='Held',
-                status='HELD'
-            )
-            session.add(bill)
-            session.flush()
+    def get_category_sales(days=None, session=None):
+        """Get quantity and revenue per product category, optionally for the last N days"""
+        with session_scope(session) as session:
+            from sqlalchemy import desc
+            category = func.coalesce(Product.category, 'Uncategorized').label('category')
+            query = session.query(
+                category,
+                func.sum(ProductSalesDaily.quantity).label('qty'),
+                func.sum(ProductSalesDaily.revenue).label('revenue')
+            ).outerjoin(Product, Product.id == ProductSalesDaily.product_id)
+            if days is not None:
+                query = query.filter(ProductSalesDaily.business_date >= _start_date(days))
+            results = query.group_by(category).order_by(desc('revenue')).all()
+            
+            return [{'category': r.category, 'qty': r.qty, 'revenue': r.revenue} for r in results]
 
-            for item in items:
-                bill_item = BillItem(
-                    bill_id=bill.id,
-                    product_id=item['product_id'],
-                    product_name=item['product_name'],
-                    quantity=item['quantity'],
-                    unit=item['unit'],
-                    price=item['price'],
-                    total=item['total']
-                )
-                session.add(bill_item)
+    @staticmethod
+    @_analytics_cache.cached
+    def get_payment_method_stats(days=None, session=None):
+        """Get distribution of payment methods, optionally for the last N days"""
+        with session_scope(session) as session:
+            query = session.query(
+                DailySales.payment_method,
+                func.sum(DailySales.bill_count).label('count'),
+                func.sum(DailySales.total).label('total')
+            )
+            if days is not None:
+                query = query.filter(DailySales.business_date >= _start_date(days))
+            results = query.group_by(DailySales.payment_method).all()
             
-            session.commit()
-            return bill.id
-        except Exception as e:
-            session.rollback()
-            raise e
-        finally:
-            session.close()
+            return [{'method': r.payment_method, 'count': r.count, 'total': r.total} for r in results if r.count]
+
+    @staticmethod
+    def hold_bill(bill_data, items, session=None):
+        """Save bill with status 'HELD'"""
+        with session_scope(session) as session:
+            bill = _insert_bill(session, bill_data, items, 'Held', 'HELD')
+            BillModel._changed(session, 'bill_committed', dict(bill, amount_paid=0, items=[dict(i) for i in items]))
+            return bill['id']
 
     @staticmethod
-    def get_held_bills():
+    def get_held_bills(session=None):
         """Get all held bills"""
-        session = get_db()
-        try:
+        with session_scope(session) as session:
             bills = session.query(Bill).filter(Bill.status == 'HELD').all()
             # Eager load items? For now just basic info, we load items when resuming
             return [b.to_dict() for b in bills]
-        finally:
-            session.close()
 
     @staticmethod
-    def get_bill_items(bill_id):
+    def get_bill_items(bill_id, session=None):
         """Get items for a specific bill"""
-        session = get_db()
-        try:
+        with session_scope(session) as session:
             items = session.query(BillItem).filter(BillItem.bill_id == bill_id).all()
-            return [{
-                'product_id': i.product_id,
-                'product_name': i.product_name,
-                'quantity': i.quantity,
-                'unit': i.unit,
-                'price': i.price,
-                'total': i.total
-            } for i in items]
-        finally:
-            session.close()
-
-    @staticmethod
-    def delete_bill(bill_id):
+            return [i.to_dict() for i in items]
+
+    @staticmethod
+    def delete_bill(bill_id, session=None):
         """Delete a bill (used when resuming a held bill)"""
-        session = get_db()
         try:
-            bill = session.query(Bill).get(bill_id)
-            if bill:
-                session.delete(bill) # Cascade should delete items
-                session.commit()
-                return True
-            return False
+            with session_scope(session) as session:
+                bill = session.query(Bill).get(bill_id)
+                if bill:
+                    payload = _bill_payload(bill)
+                    if bill.status == 'PAID':
+                        _add_to_rollups(session, bill.business_date, bill.payment_method, bill.grand_total,
+                                        payload['items'], sign=-1)
+                    elif bill.payment_method == 'Debt' and bill.customer_id and _debt_outstanding(bill) > 0:
+                        _post_ledger_entry(session, bill.customer_id, 'CREDIT', _debt_outstanding(bill),
+                                           bill_id=bill.id, note=f"Bill {bill.bill_number} deleted")
+                    session.delete(bill) # Cascade should delete items
+                    BillModel._changed(session, 'bill_deleted', payload)
+                    return True
+                return False
         except Exception:
-            session.rollback()
             return False
-        finally:
-            session.close()
 
-class SettingsModel:
     @staticmethod
-    def get_setting(key, default=None):
-        session = get_db()
+    def rebuild_sales_rollups(session=None):
+        """Recompute the daily_sales and product_sales_daily rollups from the bills table"""
+        with session_scope(session) as session:
+            session.query(DailySales).delete()
+            session.query(ProductSalesDaily).delete()
+            session.execute(DailySales.__table__.insert().from_select(
+                ['business_date', 'payment_method', 'bill_count', 'total'],
+                session.query(
+                    Bill.business_date,
+                    func.coalesce(Bill.payment_method, 'Unknown'),
+                    func.count(Bill.id),
+                    func.sum(Bill.grand_total)
+                ).filter(
+                    Bill.status == 'PAID'
+                ).group_by(
+                    Bill.business_date, func.coalesce(Bill.payment_method, 'Unknown')
+                ).statement
+            ))
+            session.execute(ProductSalesDaily.__table__.insert().from_select(
+                ['product_id', 'business_date', 'product_name', 'quantity', 'revenue'],
+                session.query(
+                    BillItem.product_id,
+                    Bill.business_date,
+                    func.max(BillItem.product_name),
+                    func.sum(BillItem.quantity),
+                    func.sum(BillItem.total)
+                ).join(Bill).filter(
+                    Bill.status == 'PAID'
+                ).group_by(
+                    BillItem.product_id, Bill.business_date
+                ).statement
+            ))
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session):
+    if session.in_nested_transaction():
+        return # A SAVEPOINT was released; wait for the real commit
+    note_committed_writes()
+    settings = session.info.pop('setting_changes', None)
+    products = session.info.pop('product_changes', None)
+    customers = session.info.pop('customer_changes', None)
+    bills = session.info.pop('bill_changes', None)
+    if settings:
+        SettingsModel._apply_changes(settings)
+    if products:
+        _notify(ProductModel._listeners, products)
+    if customers:
+        _notify(CustomerModel._listeners, customers)
+    if bills:
+        _notify(BillModel._listeners, bills)
+
+# session.info keys holding changes that wait for the outer commit
+_PENDING_CHANGES = ('setting_changes', 'product_changes', 'customer_changes', 'bill_changes')
+
+@event.listens_for(Session, "after_transaction_create")
+def _mark_savepoint(session, transaction):
+    # Remember what was pending when a SAVEPOINT started, so rolling it back
+    # drops only the changes made inside it
+    if transaction.nested:
+        session.info.setdefault('savepoint_marks', []).append(
+            {key: copy.copy(session.info[key]) for key in _PENDING_CHANGES if key in session.info})
+
+@event.listens_for(Session, "after_transaction_end")
+def _unmark_savepoint(session, transaction):
+    if transaction.nested and session.info.get('savepoint_marks'):
+        session.info['savepoint_marks'].pop()
+
+@event.listens_for(Session, "after_rollback")
+def _drop_changes(session):
+    marks = session.info.get('savepoint_marks')
+    if session.in_nested_transaction() and marks:
+        # Only a SAVEPOINT failed; the outer transaction may still commit
+        for key in _PENDING_CHANGES:
+            if key in marks[-1]:
+                session.info[key] = copy.copy(marks[-1][key])
+            else:
+                session.info.pop(key, None)
+        return
+    for key in _PENDING_CHANGES:
+        session.info.pop(key, None)
+
+def _notify(listeners, changes):
+    for callback in list(listeners):
         try:
-            setting = session.query(Setting).filter_by(key=key).first()
-            return setting.value if setting else default
-        finally:
-            session.close()
+            callback(changes)
+        except Exception as e:
+            error_logger.error(f"Change listener failed: {e}")
+
+class SettingsModel:
+    """
+    Settings are read once into an in-memory cache and served from there.
+    set_setting writes through to the database and updates the cache when
+    the transaction commits, then tells subscribers which keys changed.
+    """
+    _cache = None
+    _listeners = []
+
+    @staticmethod
+    def load(session=None):
+        """(Re)read every setting from the database into the cache"""
+        with session_scope(session) as session:
+            SettingsModel._cache = {row.key: row.value for row in session.query(Setting).all()}
+
+    @staticmethod
+    def get_setting(key, default=None, session=None):
+        if SettingsModel._cache is None:
+            SettingsModel.load(session)
+        value = SettingsModel._cache.get(key)
+        return value if value is not None else default
 
     @staticmethod
-    def set_setting(key, value):
-        session = get_db()
+    def get_int(key, default=0):
         try:
+            return int(SettingsModel.get_setting(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    @staticmethod
+    def get_bool(key, default=False):
+        value = SettingsModel.get_setting(key)
+        if value is None:
+            return default
+        return str(value).lower() == 'true'
+
+    @staticmethod
+    def set_setting(key, value, session=None):
+        with session_scope(session) as session:
             setting = session.query(Setting).filter_by(key=key).first()
             if setting:
                 setting.value = value
             else:
                 setting = Setting(key=key, value=value)
                 session.add(setting)
-            session.commit()
-        finally:
-            session.close()
+            session.flush()
+            # Published by _publish_changes once the outer transaction commits
+            session.info.setdefault('setting_changes', {})[key] = value
+
+    @staticmethod
+    def subscribe(callback):
+        """Call callback(changes) with a {key: value} dict whenever settings change"""
+        if callback not in SettingsModel._listeners:
+            SettingsModel._listeners.append(callback)
+
+    @staticmethod
+    def unsubscribe(callback):
+        if callback in SettingsModel._listeners:
+            SettingsModel._listeners.remove(callback)
+
+    @staticmethod
+    def _apply_changes(changes):
+        cache = SettingsModel._cache
+        if cache is None:
+            changed = changes # Nothing cached yet; the next read loads everything
+        else:
+            changed = {k: v for k, v in changes.items() if cache.get(k) != v}
+            cache.update(changes)
+        if changed:
+            _notify(SettingsModel._listeners, changed)
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Index
+from sqlalchemy.orm import relationship, validates
 from app.db import Base
+from app.utils.helpers import normalize_phone
 from datetime import datetime
 
 class Product(Base):
@@ -8,11 +9,13 @@ class Product(Base):
     
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
-    code = Column(String)
+    code = Column(String, index=True)
     base_unit = Column(String, nullable=False)
-    price_per_unit = Column(Float, nullable=False)
+    price_per_unit = Column(Integer, nullable=False) # paise
     category = Column(String)
 
+    barcodes = relationship("ProductBarcode", back_populates="product", cascade="all, delete-orphan")
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -23,36 +26,74 @@ class Product(Base):
             'category': self.category
         }
 
+class ProductBarcode(Base):
+    """Extra barcodes for a product (supplier EANs, pack sizes) besides Product.code."""
+    __tablename__ = 'product_barcodes'
+    
+    id = Column(Integer, primary_key=True)
+    barcode = Column(String, unique=True, nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False, index=True)
+    pack_qty = Column(Float, nullable=False, default=1) # Base units one scan adds, e.g. 6 for a six-pack
+
+    product = relationship("Product", back_populates="barcodes")
+
+    def to_dict(self):
+        return {
+            'barcode': self.barcode,
+            'product_id': self.product_id,
+            'pack_qty': self.pack_qty
+        }
+
 class Customer(Base):
     __tablename__ = 'customers'
     
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
     phone = Column(String, unique=True)
+    # Lookup keys derived from phone: digits only, and the same reversed for "last digits" search
+    phone_normalized = Column(String, unique=True, index=True)
+    phone_reversed = Column(String, index=True)
     address = Column(String)
+    balance = Column(Integer, nullable=False, default=0, server_default='0', index=True) # Outstanding debt in paise, kept in step with customer_ledger
+
+    @validates('phone')
+    def _set_phone_keys(self, key, phone):
+        self.phone_normalized = normalize_phone(phone)
+        self.phone_reversed = self.phone_normalized[::-1] if self.phone_normalized else None
+        return phone
 
     def to_dict(self):
         return {
             'id': self.id,
             'name': self.name,
             'phone': self.phone,
-            'address': self.address
+            'address': self.address,
+            'balance': self.balance
         }
 
 class Bill(Base):
     __tablename__ = 'bills'
+    __table_args__ = (
+        Index('ix_bills_status_business_date', 'status', 'business_date'),
+        Index('ix_bills_payment_method_status', 'payment_method', 'status'),
+        Index('ix_bills_customer_debt', 'customer_id', 'payment_method', 'status'),
+    )
     
     id = Column(Integer, primary_key=True)
     bill_number = Column(String, unique=True, nullable=False)
     customer_id = Column(Integer, ForeignKey('customers.id'), nullable=True)
     date_time = Column(String, nullable=False) # Keeping as string to match existing format
-    subtotal = Column(Float, nullable=False)
+    created_ts = Column(Integer, index=True) # Unix epoch of date_time, for range queries
+    business_date = Column(String(10), index=True) # YYYY-MM-DD of date_time, for per-day grouping
+    # Money columns hold integer paise
+    subtotal = Column(Integer, nullable=False)
     tax_percent = Column(Float, default=0)
-    tax_amount = Column(Float, default=0)
-    discount_amount = Column(Float, default=0)
-    grand_total = Column(Float, nullable=False)
+    tax_amount = Column(Integer, default=0)
+    discount_amount = Column(Integer, default=0)
+    grand_total = Column(Integer, nullable=False)
     payment_method = Column(String)
     status = Column(String, default='PAID')
+    amount_paid = Column(Integer, nullable=False, default=0, server_default='0') # paise settled so far on a Debt bill
     
     customer = relationship("Customer")
     items = relationship("BillItem", back_populates="bill", cascade="all, delete-orphan")
@@ -70,6 +111,7 @@ class Bill(Base):
             'grand_total': self.grand_total,
             'payment_method': self.payment_method,
             'status': self.status,
+            'amount_paid': self.amount_paid,
             'customer_name': self.customer.name if self.customer else None,
             'customer_phone': self.customer.phone if self.customer else None
         }
@@ -78,17 +120,77 @@ class BillItem(Base):
     __tablename__ = 'bill_items'
     
     id = Column(Integer, primary_key=True)
-    bill_id = Column(Integer, ForeignKey('bills.id'), nullable=False)
-    product_id = Column(Integer, ForeignKey('products.id'), nullable=False)
+    bill_id = Column(Integer, ForeignKey('bills.id'), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey('products.id'), nullable=False, index=True)
     product_name = Column(String, nullable=False)
     quantity = Column(Float, nullable=False)
     unit = Column(String, nullable=False)
-    price = Column(Float, nullable=False)
-    total = Column(Float, nullable=False)
+    price = Column(Integer, nullable=False) # paise per unit
+    total = Column(Integer, nullable=False) # paise
     
     bill = relationship("Bill", back_populates="items")
     product = relationship("Product")
 
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'quantity': self.quantity,
+            'unit': self.unit,
+            'price': self.price,
+            'total': self.total
+        }
+
+class CustomerLedger(Base):
+    """Debits (Debt bills) and credits (payments) per customer, with the balance after each entry."""
+    __tablename__ = 'customer_ledger'
+    __table_args__ = (
+        Index('ix_customer_ledger_customer_id', 'customer_id', 'id'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    customer_id = Column(Integer, ForeignKey('customers.id'), nullable=False)
+    bill_id = Column(Integer, nullable=True) # No FK: entries outlive deleted bills
+    date_time = Column(String, nullable=False)
+    entry_type = Column(String, nullable=False) # 'DEBIT' or 'CREDIT'
+    amount = Column(Integer, nullable=False) # paise, always positive
+    balance_after = Column(Integer, nullable=False) # paise
+    note = Column(String)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'customer_id': self.customer_id,
+            'bill_id': self.bill_id,
+            'date_time': self.date_time,
+            'entry_type': self.entry_type,
+            'amount': self.amount,
+            'balance_after': self.balance_after,
+            'note': self.note
+        }
+
+class DailySales(Base):
+    """Rollup of PAID bills per business day and payment method, kept in step by BillModel."""
+    __tablename__ = 'daily_sales'
+    
+    business_date = Column(String(10), primary_key=True)
+    payment_method = Column(String, primary_key=True)
+    bill_count = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0) # paise
+
+class ProductSalesDaily(Base):
+    """Rollup of PAID bill items per product and business day, kept in step by BillModel."""
+    __tablename__ = 'product_sales_daily'
+    __table_args__ = (
+        Index('ix_product_sales_daily_business_date', 'business_date'),
+    )
+    
+    product_id = Column(Integer, primary_key=True)
+    business_date = Column(String(10), primary_key=True)
+    product_name = Column(String) # Last name sold under, for products deleted since
+    quantity = Column(Float, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0) # paise
+
 class Setting(Base):
     __tablename__ = 'settings'
     
@@ -6,13 +6,8 @@ import tempfile
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from escpos.printer import Usb, Serial, Network, Dummy
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.graphics.barcode import code128
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics import renderPDF
+# python-escpos and reportlab take a noticeable part of a second to import,
+# so they are imported where a receipt or label is actually produced
 try:
     import win32api
     import win32print
@@ -22,6 +17,7 @@ except ImportError:
 from app.utils.logger import error_logger, transaction_logger
 from app.utils.exceptions import PrinterError
 from app.models import SettingsModel
+from app.utils.helpers import format_paise
 
 
 def get_windows_printers():
@@ -96,6 +92,17 @@ class PrinterManager:
         self.printer = None
         self.queue_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'print_queue.json')
         self._load_queue()
+        SettingsModel.subscribe(self.on_settings_changed)
+
+    def on_settings_changed(self, changes):
+        # Drop the connection so the next print reconnects with the new settings
+        if any(key.startswith('printer_') for key in changes):
+            self.printer = None
+
+    def close(self):
+        """Stop following settings changes; call when this manager is discarded"""
+        SettingsModel.unsubscribe(self.on_settings_changed)
+        self.printer = None
 
     def _load_queue(self):
         if os.path.exists(self.queue_file):
@@ -113,6 +120,7 @@ class PrinterManager:
 
     def connect_printer(self):
         """Attempts to connect to the configured printer."""
+        from escpos.printer import Usb, Serial, Network, Dummy
         printer_type = SettingsModel.get_setting('printer_type', 'Windows Printer')
         try:
             if printer_type == 'USB (Direct)':
@@ -166,16 +174,16 @@ class PrinterManager:
             for item in items:
                 name = item['product_name'][:16]
                 qty = f"{item['quantity']}{item['unit']}"
-                price = f"{item['total']:.2f}"
+                price = format_paise(item['total'])
                 self.printer.text(f"{name:<16} {qty:<5} {price:<8}\n")
 
             self.printer.text("-" * 32 + "\n")
-            self.printer.text(f"Subtotal: {bill_data['subtotal']:.2f}\n")
+            self.printer.text(f"Subtotal: {format_paise(bill_data['subtotal'])}\n")
             if bill_data.get('tax_amount'):
-                self.printer.text(f"Tax: {bill_data['tax_amount']:.2f}\n")
+                self.printer.text(f"Tax: {format_paise(bill_data['tax_amount'])}\n")
             if bill_data.get('discount_amount'):
-                self.printer.text(f"Discount: -{bill_data['discount_amount']:.2f}\n")
-            self.printer.text(f"Total: {bill_data['grand_total']:.2f}\n")
+                self.printer.text(f"Discount: -{format_paise(bill_data['discount_amount'])}\n")
+            self.printer.text(f"Total: {format_paise(bill_data['grand_total'])}\n")
             self.printer.text("-" * 32 + "\n")
             self.printer.text(f"{footer_text}\n")
             self.printer.cut()
@@ -200,7 +208,7 @@ class PrinterManager:
         footer_text = SettingsModel.get_setting('receipt_footer', 'Thank you for shopping!')
         
         # Get paper width setting
-        WIDTH = int(SettingsModel.get_setting('chars_per_line', '48'))
+        WIDTH = SettingsModel.get_int('chars_per_line', 48)
         line_spacing = SettingsModel.get_setting('line_spacing', 'Normal')
         
         # Calculate column widths based on paper width
@@ -241,7 +249,7 @@ class PrinterManager:
         for item in items:
             name = item['product_name'][:item_col]
             qty = f"{item['quantity']}{item['unit']}"[:qty_col]
-            amt = f"{item['total']:.2f}"[:amt_col]
+            amt = format_paise(item['total'])[:amt_col]
             lines.append(f"{name:<{item_col}} {qty:^{qty_col}} {amt:>{amt_col}}")
         
         lines.append("-" * WIDTH)
@@ -249,15 +257,15 @@ class PrinterManager:
             lines.append(spacing)
         
         label_col = WIDTH - amt_col - 2
-        lines.append(f"{'Subtotal':<{label_col}} Rs.{bill_data['subtotal']:>{amt_col-3}.2f}")
+        lines.append(f"{'Subtotal':<{label_col}} Rs.{format_paise(bill_data['subtotal']):>{amt_col-3}}")
         if bill_data.get('tax_amount') and bill_data['tax_amount'] > 0:
-            lines.append(f"{'Tax':<{label_col}} Rs.{bill_data['tax_amount']:>{amt_col-3}.2f}")
+            lines.append(f"{'Tax':<{label_col}} Rs.{format_paise(bill_data['tax_amount']):>{amt_col-3}}")
         if bill_data.get('discount_amount') and bill_data['discount_amount'] > 0:
-            lines.append(f"{'Discount':<{label_col}} -{bill_data['discount_amount']:>{amt_col-2}.2f}")
+            lines.append(f"{'Discount':<{label_col}} -{format_paise(bill_data['discount_amount']):>{amt_col-2}}")
         if spacing:
             lines.append(spacing)
         lines.append("=" * WIDTH)
-        lines.append(f"{'TOTAL':<{label_col}} Rs.{bill_data['grand_total']:>{amt_col-3}.2f}")
+        lines.append(f"{'TOTAL':<{label_col}} Rs.{format_paise(bill_data['grand_total']):>{amt_col-3}}")
         lines.append("=" * WIDTH)
         if spacing:
             lines.append(spacing)
@@ -389,6 +397,9 @@ public class RawPrinter {{
 
     def generate_pdf(self, bill_data, items, filename):
         """Generates a PDF receipt."""
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import mm
         try:
             c = canvas.Canvas(filename, pagesize=A4)
             width, height = A4
@@ -431,11 +442,11 @@ public class RawPrinter {{
             for item in items:
                 c.drawString(20*mm, y, item['product_name'])
                 c.drawString(100*mm, y, f"{item['quantity']} {item['unit']}")
-                c.drawString(150*mm, y, f"{item['total']:.2f}")
+                c.drawString(150*mm, y, format_paise(item['total']))
                 y -= 10*mm
 
             y -= 10*mm
-            c.drawString(120*mm, y, f"Total: {bill_data['grand_total']:.2f}")
+            c.drawString(120*mm, y, f"Total: {format_paise(bill_data['grand_total'])}")
             
             c.save()
             return True
@@ -459,7 +470,7 @@ public class RawPrinter {{
             msg['To'] = recipient_email
             msg['Subject'] = f"Receipt from Thangam Stores - {bill_data['bill_number']}"
 
-            body = f"Thank you for shopping!\n\nBill No: {bill_data['bill_number']}\nTotal: {bill_data['grand_total']:.2f}"
+            body = f"Thank you for shopping!\n\nBill No: {bill_data['bill_number']}\nTotal: {format_paise(bill_data['grand_total'])}"
             msg.attach(MIMEText(body, 'plain'))
 
             server = smtplib.SMTP(smtp_server, int(smtp_port))
@@ -473,8 +484,12 @@ public class RawPrinter {{
             error_logger.error(f"Email failed: {e}")
             raise PrinterError(f"Failed to send email: {e}")
 
-    def print_barcode_label(self, product_data, count=1):
-        """Generates and prints barcode labels for a product."""
+    def print_barcode_label(self, product_data, count=1, barcode=None):
+        """Generates and prints barcode labels for a product, using barcode instead of its code if given."""
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.units import mm
+        from reportlab.graphics.barcode import code128
+        from reportlab.graphics.shapes import Drawing
         printer_name = SettingsModel.get_setting('windows_printer_name', '')
         if not printer_name:
             # Fallback to default if not set? OR just error. 
@@ -492,14 +507,14 @@ public class RawPrinter {{
             label_height = 25 * mm
             
             # Temporary file for the label
-            temp_file = os.path.join(tempfile.gettempdir(), f"label_{product_data.get('code', 'ukn')}.pdf")
+            temp_file = os.path.join(tempfile.gettempdir(), f"label_{barcode or product_data.get('code', 'ukn')}.pdf")
             
             c = canvas.Canvas(temp_file, pagesize=(label_width, label_height))
             
             store_name = SettingsModel.get_setting('store_name', 'Thangam Stores')
-            price = product_data.get('price_per_unit', 0.0)
+            price = product_data.get('price_per_unit', 0)
             name = product_data.get('name', 'Product')
-            code = product_data.get('code', '')
+            code = barcode or product_data.get('code', '')
             if not code:
                 code = f"P{product_data.get('id')}" # Fallback internal code
             
@@ -536,7 +551,7 @@ public class RawPrinter {{
             
             # Price (Bottom Right or Centered)
             c.setFont("Helvetica-Bold", 9)
-            c.drawCentredString(label_width / 2, 1.5*mm, f"Rs.{price:.2f}")
+            c.drawCentredString(label_width / 2, 1.5*mm, f"Rs.{format_paise(price)}")
             
             c.showPage()
             c.save()
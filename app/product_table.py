@@ -0,0 +1,145 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from app.utils.helpers import format_paise
+
+def search_key(product):
+    """Casefolded name and code, what the product manager's search matches against"""
+    return f"{product['name']}\n{product['code'] or ''}".casefold()
+
+class ProductTableModel(QAbstractTableModel):
+    """
+    Every product for the product manager, filtered and sorted in place.
+
+    Each product's search key is built once on load, so filtering is a
+    substring test per product with no per-row calls into Qt, and typing
+    more of the same query only re-checks the rows already shown. Rows are
+    kept as a list of product ids; views fetch cells lazily, so neither
+    60k products nor a new filter creates any per-row widget items.
+
+    Edits arrive through apply() with ProductModel's change lists and touch
+    only the affected row.
+    """
+    COLUMNS = ["Name", "Code", "Unit", "Price", "Category"]
+    NAME, CODE, UNIT, PRICE, CATEGORY = range(5)
+    FIELDS = ('name', 'code', 'base_unit', 'price_per_unit', 'category')
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.products = {} # id -> product dict
+        self.keys = {} # id -> search_key
+        self.column_keys = {} # column -> {id: sort value}, see sort_key()
+        self.rows = [] # ids shown, in display order
+        self.query = ''
+        self.sort_column = self.NAME
+        self.sort_order = Qt.SortOrder.AscendingOrder
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        product = self.products[self.rows[index.row()]]
+        if index.column() == self.PRICE:
+            return format_paise(product['price_per_unit'])
+        return product[self.FIELDS[index.column()]]
+
+    def product(self, row):
+        return self.products[self.rows[row]] if 0 <= row < len(self.rows) else None
+
+    def load(self, products):
+        self.products = {p['id']: p for p in products}
+        self.keys = {p['id']: search_key(p) for p in products}
+        self.column_keys = {}
+        self.query = None # forces a full filter and sort
+        self.set_filter('')
+
+    def matches(self, product_id, terms):
+        key = self.keys[product_id]
+        return all(term in key for term in terms)
+
+    def set_filter(self, text):
+        """Show products whose name or code contains every word of text"""
+        query = text.strip().casefold()
+        if query == self.query:
+            return
+        terms = query.split()
+        # A longer query only narrows: filter what is shown, already in order
+        narrowing = bool(self.query) and query.startswith(self.query)
+        candidates = self.rows if narrowing else self.keys
+        self.beginResetModel()
+        rows, keys = list(candidates), self.keys
+        for term in terms:
+            rows = [pid for pid in rows if term in keys[pid]]
+        self.rows = rows
+        if not narrowing:
+            self._sort_rows()
+        self.query = query
+        self.endResetModel()
+
+    def sort_key(self, column):
+        """id -> sort value for a column, built on the first sort by it"""
+        if column == self.NAME:
+            return self.keys.__getitem__
+        if column not in self.column_keys:
+            field = self.FIELDS[column]
+            if column == self.PRICE:
+                values = {pid: p[field] for pid, p in self.products.items()}
+            elif column == self.CODE:
+                values = {pid: p[field] or '' for pid, p in self.products.items()}
+            else:
+                values = {pid: (p[field] or '').casefold() for pid, p in self.products.items()}
+            self.column_keys[column] = values
+        return self.column_keys[column].__getitem__
+
+    def _sort_rows(self):
+        self.rows.sort(key=self.sort_key(self.sort_column),
+                       reverse=self.sort_order == Qt.SortOrder.DescendingOrder)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        self.layoutAboutToBeChanged.emit()
+        # Keep the selection on the same products as they move
+        old = self.persistentIndexList()
+        ids = [self.rows[i.row()] for i in old]
+        self._sort_rows()
+        if old:
+            position = {pid: row for row, pid in enumerate(self.rows)}
+            self.changePersistentIndexList(old, [self.index(position[pid], i.column()) for pid, i in zip(ids, old)])
+        self.layoutChanged.emit()
+
+    def apply(self, changes):
+        for action, payload in changes:
+            if action == 'barcodes':
+                continue
+            self.column_keys = {}
+            product_id = payload['id']
+            if action == 'deleted':
+                self.products.pop(product_id, None)
+                self.keys.pop(product_id, None)
+                if product_id in self.rows:
+                    row = self.rows.index(product_id)
+                    self.beginRemoveRows(QModelIndex(), row, row)
+                    del self.rows[row]
+                    self.endRemoveRows()
+                continue
+            self.products[product_id] = payload
+            self.keys[product_id] = search_key(payload)
+            if product_id in self.rows:
+                row = self.rows.index(product_id)
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+            elif action == 'added' and self.matches(product_id, (self.query or '').split()):
+                # Shown at the end until the next sort or search puts it in place
+                row = len(self.rows)
+                self.beginInsertRows(QModelIndex(), row, row)
+                self.rows.append(product_id)
+                self.endInsertRows()
@@ -0,0 +1,83 @@
+"""
+Result cache for read-only model queries.
+
+An entry is keyed by the query and its arguments and is served only while
+it is younger than the TTL and the database is still at the data version
+it was read at (app.db.data_version, bumped by every committed write). The
+TTL bounds staleness from writes the version cannot see, such as another
+process or the date moving on. Past maxsize the least recently used entry
+is dropped.
+"""
+import copy
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+from app.db import data_version
+
+class QueryCache:
+    def __init__(self, maxsize=64, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict() # key -> (data version, expiry, result)
+        self.hits = 0
+        self.misses = 0
+        # The dashboard queries from a pool thread while the UI thread may too
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        """(True, a copy of the result) on a hit, (False, None) otherwise"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == version and entry[1] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return True, copy.deepcopy(entry[2])
+            self.misses += 1
+            return False, None
+
+    def put(self, key, version, result):
+        with self.lock:
+            self.entries[key] = (version, time.monotonic() + self.ttl, copy.deepcopy(result))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries),
+                    'hit_rate': self.hits / total if total else 0.0}
+
+    def cached(self, func):
+        """
+        Decorator for a model query taking session=None. Callers get their
+        own copy of the result, so changing it cannot corrupt the cache.
+        Calls given a session go straight to the database, since that
+        session may hold writes not yet committed.
+        """
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            if bound.arguments.get('session') is not None:
+                return func(*args, **kwargs)
+            bound.apply_defaults()
+            key = (func.__qualname__,) + tuple(value for name, value in bound.arguments.items() if name != 'session')
+            # Read before querying: a write committed meanwhile leaves the
+            # result filed under the old version, where it will not be served
+            version = data_version()
+            found, result = self.get(key, version)
+            if found:
+                return result
+            result = func(*args, **kwargs)
+            self.put(key, version, result)
+            return result
+        return wrapper
@@ -0,0 +1,227 @@
+import time
+from PyQt6.QtCore import Qt, QEvent, QObject, QThread, QTimer, pyqtSignal
+from PyQt6.QtGui import QKeyEvent
+from PyQt6.QtWidgets import QApplication
+
+from app.utils.logger import error_logger
+
+# scanner_suffix setting -> terminator characters
+SCANNER_SUFFIXES = {
+    "Enter (\\r)": "\r\n", # scanners set to CR often send CRLF
+    "Newline (\\n)": "\r\n",
+    "Tab (\\t)": "\t",
+    "None": "",
+}
+
+def port_device(setting):
+    """The COM port combo saves "COM3 - USB Serial Device"; the device is the part before ' - '"""
+    return setting.split(' - ')[0].strip()
+
+class ScanFramer:
+    """
+    Splits the character stream from a scanner into codes. A code ends at a
+    suffix character, or when the line has been quiet for timeout seconds
+    (scanners configured without a suffix). A configured prefix is stripped.
+    """
+    def __init__(self, prefix='', suffix='\r\n', timeout=0.1):
+        self.prefix = prefix
+        self.terminators = set(suffix)
+        self.timeout = timeout
+        self.buffer = []
+        self.last_char_at = None
+
+    def feed(self, text, now=None):
+        """Add received characters; returns the codes they complete"""
+        now = time.monotonic() if now is None else now
+        codes = self.flush_if_idle(now)
+        for char in text:
+            if char in self.terminators:
+                codes.extend(self._emit())
+            else:
+                self.buffer.append(char)
+        self.last_char_at = now
+        return codes
+
+    def flush_if_idle(self, now=None):
+        """Returns the buffered code if the scanner has gone quiet for the timeout, else []"""
+        now = time.monotonic() if now is None else now
+        if self.buffer and now - self.last_char_at >= self.timeout:
+            return self._emit()
+        return []
+
+    def _emit(self):
+        code = ''.join(self.buffer).strip()
+        self.buffer = []
+        if self.prefix and code.startswith(self.prefix):
+            code = code[len(self.prefix):]
+        return [code] if code else []
+
+class SerialScannerReader(QThread):
+    """
+    Reads a serial (COM port) barcode scanner on its own thread so scans are
+    never lost while the UI thread is busy. Complete codes are delivered
+    through the scanned signal, which Qt queues onto the receiver's thread.
+    """
+    scanned = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    SETTINGS = ('scanner_type', 'scanner_com_port', 'scanner_baud_rate',
+                'scanner_prefix', 'scanner_suffix', 'scanner_timeout')
+
+    def __init__(self, port, baudrate=9600, prefix='', suffix='\r\n', timeout_ms=100, parent=None):
+        super().__init__(parent)
+        self.port = port
+        self.baudrate = baudrate
+        self.framer = ScanFramer(prefix, suffix, timeout_ms / 1000.0)
+
+    @classmethod
+    def from_settings(cls, get_setting, parent=None):
+        """A reader for the configured serial scanner, or None if the scanner is not on a COM port"""
+        if get_setting('scanner_type', '') != "Serial COM Port":
+            return None
+        port = port_device(get_setting('scanner_com_port', ''))
+        if not port:
+            return None
+        return cls(
+            port,
+            baudrate=int(get_setting('scanner_baud_rate', '9600')),
+            prefix=get_setting('scanner_prefix', ''),
+            suffix=SCANNER_SUFFIXES.get(get_setting('scanner_suffix', "Enter (\\r)"), "\r\n"),
+            timeout_ms=int(get_setting('scanner_timeout', '100')),
+            parent=parent
+        )
+
+    def run(self):
+        import serial
+        try:
+            # Reads block for at most a quarter of the scan timeout, so a
+            # suffix-less code is framed promptly and stop() is noticed
+            conn = serial.Serial(self.port, self.baudrate, timeout=self.framer.timeout / 4)
+        except (serial.SerialException, ValueError) as e:
+            error_logger.error(f"Could not open scanner port {self.port}: {e}")
+            self.failed.emit(str(e))
+            return
+        try:
+            while not self.isInterruptionRequested():
+                data = conn.read(conn.in_waiting or 1)
+                if data:
+                    codes = self.framer.feed(data.decode('ascii', errors='ignore'))
+                else:
+                    codes = self.framer.flush_if_idle()
+                for code in codes:
+                    self.scanned.emit(code)
+        except serial.SerialException as e:
+            error_logger.error(f"Scanner port {self.port} failed: {e}")
+            self.failed.emit(str(e))
+        finally:
+            conn.close()
+
+    def stop(self):
+        self.requestInterruption()
+        self.wait()
+
+class KeyboardScanFilter(QObject):
+    """
+    Application event filter for scanners in keyboard (HID/wedge) mode.
+
+    A scanner types a whole code faster than any person, so key presses that
+    follow each other within scanner_timeout are held back instead of reaching
+    the focused widget. If the burst ends with the scanner's suffix (or, with
+    no suffix, goes quiet) and is long enough, it is emitted as one code
+    through scanned; otherwise the held keys are replayed to the widget they
+    were meant for. So is a burst that the optional resolves callback does
+    not recognise as a code: it was most likely fast typing, such as "1250"
+    and Enter in the qty box. Only keys for the given window are watched, so
+    dialogs (e.g. a barcode field in the product editor) still receive scans
+    as text.
+    """
+    scanned = pyqtSignal(str)
+
+    MIN_LENGTH = 4 # shorter bursts are fast typing, not scans
+
+    def __init__(self, window, prefix='', suffix='\r\n', timeout_ms=100, resolves=None):
+        super().__init__(window)
+        self.window = window
+        self.prefix = prefix
+        self.resolves = resolves # code -> bool, or None to take every burst
+        self.end_keys = set()
+        if '\r' in suffix or '\n' in suffix:
+            self.end_keys.update((Qt.Key.Key_Return, Qt.Key.Key_Enter))
+        if '\t' in suffix:
+            self.end_keys.add(Qt.Key.Key_Tab)
+        self.timeout = timeout_ms / 1000.0
+        self.held = [] # (target widget, copy of the key press)
+        self.last_key_at = 0.0
+        self.replaying = False
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.setInterval(timeout_ms)
+        self.idle_timer.timeout.connect(self.on_idle)
+
+    @classmethod
+    def from_settings(cls, get_setting, window, resolves=None):
+        """A filter for a keyboard-mode scanner, or None if the scanner is on a COM port"""
+        if get_setting('scanner_type', '') == "Serial COM Port":
+            return None
+        return cls(
+            window,
+            prefix=get_setting('scanner_prefix', ''),
+            suffix=SCANNER_SUFFIXES.get(get_setting('scanner_suffix', "Enter (\\r)"), "\r\n"),
+            timeout_ms=int(get_setting('scanner_timeout', '100')),
+            resolves=resolves
+        )
+
+    def eventFilter(self, obj, event):
+        if self.replaying or event.type() != QEvent.Type.KeyPress:
+            return False
+        # An unhandled key press is offered to each parent in turn; only look
+        # at it once, on its way to the focused widget of our window
+        if obj is not QApplication.focusWidget() or QApplication.activeWindow() is not self.window:
+            return False
+
+        now = time.monotonic()
+        if self.held and now - self.last_key_at >= self.timeout:
+            self.release()
+        if self.held and event.key() in self.end_keys:
+            if len(self.held) >= self.MIN_LENGTH and self.emit_scan():
+                return True
+            self.release()
+            return False # the end key follows the replayed keys
+
+        text = event.text()
+        modifiers = event.modifiers() & ~(Qt.KeyboardModifier.ShiftModifier | Qt.KeyboardModifier.KeypadModifier)
+        if event.isAutoRepeat() or not text or not text.isprintable() or modifiers != Qt.KeyboardModifier.NoModifier:
+            self.release()
+            return False
+
+        self.held.append((obj, QKeyEvent(event.type(), event.key(), event.modifiers(), text)))
+        self.last_key_at = now
+        self.idle_timer.start()
+        return True
+
+    def on_idle(self):
+        if self.end_keys or len(self.held) < self.MIN_LENGTH or not self.emit_scan():
+            self.release()
+
+    def emit_scan(self):
+        """Emit the held burst as a code; False (keys still held) if it is not one"""
+        code = ''.join(event.text() for _, event in self.held).strip()
+        if self.prefix and code.startswith(self.prefix):
+            code = code[len(self.prefix):]
+        if not code or (self.resolves is not None and not self.resolves(code)):
+            return False
+        self.idle_timer.stop()
+        self.held = []
+        self.scanned.emit(code)
+        return True
+
+    def release(self):
+        """Hand held keys to their widgets: they were typed, not scanned"""
+        self.idle_timer.stop()
+        held, self.held = self.held, []
+        self.replaying = True
+        try:
+            for target, event in held:
+                QApplication.sendEvent(target, event)
+        finally:
+            self.replaying = False
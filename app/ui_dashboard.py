@@ -1,17 +1,79 @@
+import heapq
+import threading
+from datetime import datetime, timedelta
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QComboBox, QPushButton, QLabel, QFrame
 )
-from PyQt6.QtCore import Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
 from app.models import BillModel
+from app.charts import BarChart, HBarChart, PieChart
+from app.ui_error_handler import show_error, show_info
+from app.utils.helpers import to_rupees
+from app.utils.logger import error_logger
+
+def format_rupees(value):
+    return f"₹{value:,.2f}"
+
+TOP_PRODUCTS = 5
+
+class DashboardSignals(QObject):
+    # request id, {'sales': ..., 'products': ..., 'payments': ...} as BillModel returns them
+    loaded = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+
+class DashboardRequest(QRunnable):
+    """
+    Runs the dashboard's analytics queries on a pool thread. A request
+    superseded by a newer one is cancelled through its event and drops its
+    result instead of delivering data nobody will see.
+    """
+    def __init__(self, request_id, days, signals, cancelled):
+        super().__init__()
+        self.request_id = request_id
+        self.days = days
+        self.signals = signals
+        self.cancelled = cancelled # threading.Event, kept by the widget
+
+    def run(self):
+        try:
+            data = {}
+            # Every product sold in the range, not just the top few, so bills
+            # can later be applied to the ranking without asking again
+            for name, query in (('sales', lambda: BillModel.get_sales_trends(self.days)),
+                                ('products', lambda: BillModel.get_top_selling_products(limit=None, days=self.days)),
+                                ('payments', lambda: BillModel.get_payment_method_stats(self.days))):
+                if self.cancelled.is_set():
+                    return
+                data[name] = query()
+            if not self.cancelled.is_set():
+                self.signals.loaded.emit(self.request_id, data)
+        except Exception as e:
+            error_logger.error(f"Dashboard refresh failed: {e}")
+            self.signals.failed.emit(self.request_id, str(e))
 
 class DashboardWidget(QWidget):
+    """
+    Charts are loaded once per date range on a pool thread. After that each
+    committed, settled or deleted PAID bill is applied to the cached series
+    from BillModel's events, so the dashboard stays current without Refresh.
+    """
     def __init__(self, parent=None):
         super().__init__(parent)
+        # One thread: a new request queues behind (and cancels) the one in progress
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self.signals = DashboardSignals(self)
+        self.signals.loaded.connect(self.on_loaded)
+        self.signals.failed.connect(self.on_failed)
+        self.cancel_current = threading.Event()
+        self.request_id = 0
+        self.loading = False
+        self.start_date = None
+        self.data = None
+        self.products = {} # product_id -> entry of self.data['products']
         self.init_ui()
         self.load_data()
+        BillModel.subscribe(self.on_bills_changed)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -23,13 +85,21 @@ class DashboardWidget(QWidget):
         self.days_combo = QComboBox()
         self.days_combo.addItems(["Last 7 Days", "Last 30 Days", "Last 90 Days"])
         self.days_combo.currentIndexChanged.connect(self.load_data)
-        
+
         btn_refresh = QPushButton("Refresh Data")
         btn_refresh.clicked.connect(self.load_data)
 
+        btn_export = QPushButton("Export Charts")
+        btn_export.clicked.connect(self.export_charts)
+
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #666; font-style: italic;")
+
         filter_layout.addWidget(QLabel("Date Range:"))
         filter_layout.addWidget(self.days_combo)
         filter_layout.addWidget(btn_refresh)
+        filter_layout.addWidget(btn_export)
+        filter_layout.addWidget(self.status_label)
         filter_layout.addStretch()
         layout.addLayout(filter_layout)
 
@@ -37,17 +107,17 @@ class DashboardWidget(QWidget):
         charts_layout = QHBoxLayout()
 
         # Left: Sales Trends
-        self.sales_canvas = FigureCanvas(Figure(figsize=(5, 4), dpi=100))
-        charts_layout.addWidget(self.sales_canvas, stretch=2)
+        self.sales_chart = BarChart("Sales Trends (₹)", '#4CAF50', format_rupees)
+        charts_layout.addWidget(self.sales_chart, stretch=2)
 
         # Right Column
         right_layout = QVBoxLayout()
-        self.top_prod_canvas = FigureCanvas(Figure(figsize=(5, 3), dpi=100))
-        self.payment_canvas = FigureCanvas(Figure(figsize=(5, 3), dpi=100))
-        
-        right_layout.addWidget(self.top_prod_canvas)
-        right_layout.addWidget(self.payment_canvas)
-        
+        self.top_prod_chart = HBarChart("Top Selling Products (Qty)", '#2196F3', lambda v: f"{v:g}")
+        self.payment_chart = PieChart("Payment Methods (By Value)", value_format=format_rupees)
+
+        right_layout.addWidget(self.top_prod_chart)
+        right_layout.addWidget(self.payment_chart)
+
         charts_layout.addLayout(right_layout, stretch=1)
         layout.addLayout(charts_layout)
 
@@ -56,65 +126,115 @@ class DashboardWidget(QWidget):
     def load_data(self):
         range_map = {0: 7, 1: 30, 2: 90}
         days = range_map.get(self.days_combo.currentIndex(), 7)
-        
-        sales_data = BillModel.get_sales_trends(days)
-        top_products = BillModel.get_top_selling_products()
-        payment_stats = BillModel.get_payment_method_stats()
 
-        self.plot_sales(sales_data)
-        self.plot_top_products(top_products)
-        self.plot_payment_dist(payment_stats)
+        self.cancel_current.set()
+        self.cancel_current = threading.Event()
+        self.request_id += 1
+        self.loading = True
+        self.start_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        self.status_label.setText("Loading...")
+        self.pool.start(DashboardRequest(self.request_id, days, self.signals, self.cancel_current))
+
+    def on_loaded(self, request_id, data):
+        if request_id != self.request_id:
+            return # a newer request is on its way
+        self.loading = False
+        self.status_label.setText("")
+        self.data = data
+        self.products = {p['product_id']: p for p in data['products']}
+        self.update_top_products()
+        self.plot_sales(data['sales'])
+        self.plot_payment_dist(data['payments'])
+
+    def on_failed(self, request_id, message):
+        if request_id == self.request_id:
+            self.loading = False
+            self.status_label.setText(f"Could not load: {message}")
+
+    def on_bills_changed(self, changes):
+        for event, bill in changes:
+            if self.loading:
+                # The queries in flight may have run before this bill; ask again
+                self.load_data()
+                return
+            if self.data is None:
+                return
+            if event == 'bills_cleared':
+                self.on_loaded(self.request_id, {'sales': {}, 'products': [], 'payments': []})
+            elif bill['status'] == 'PAID' and bill['business_date'] >= self.start_date:
+                # Only PAID bills are in the rollups the charts come from
+                self.apply_bill(bill, -1 if event == 'bill_deleted' else 1)
+
+    def apply_bill(self, bill, sign):
+        """Add (sign=1) or remove (sign=-1) one PAID bill from the cached series and charts"""
+        amount = sign * bill['grand_total']
+
+        sales = self.data['sales']
+        date = bill['business_date']
+        is_new = date not in sales
+        sales[date] = sales.get(date, 0) + amount
+        if not sales[date]:
+            del sales[date]
+            self.plot_sales(sales)
+        elif is_new and date != max(sales):
+            self.plot_sales(sales) # lands between existing days
+        else:
+            self.sales_chart.add_value(date[5:], to_rupees(amount))
+
+        method = bill['payment_method'] or 'Unknown'
+        payments = self.data['payments']
+        entry = next((p for p in payments if p['method'] == method), None)
+        if entry is None:
+            entry = {'method': method, 'count': 0, 'total': 0}
+            payments.append(entry)
+        entry['count'] += sign
+        entry['total'] += amount
+        if entry['count'] <= 0:
+            payments.remove(entry)
+            self.plot_payment_dist(payments)
+        else:
+            self.payment_chart.set_value(method, to_rupees(entry['total']))
+
+        for item in bill['items']:
+            entry = self.products.get(item['product_id'])
+            if entry is None:
+                entry = {'product_id': item['product_id'], 'name': item['product_name'], 'qty': 0, 'revenue': 0}
+                self.products[item['product_id']] = entry
+                self.data['products'].append(entry)
+            entry['qty'] += sign * item['quantity']
+            entry['revenue'] += sign * item['total']
+            if entry['qty'] <= 0:
+                del self.products[item['product_id']]
+                self.data['products'].remove(entry)
+        self.update_top_products()
+
+    def update_top_products(self):
+        self.data['top_products'] = heapq.nlargest(TOP_PRODUCTS, self.data['products'], key=lambda p: p['qty'])
+        self.plot_top_products(self.data['top_products'])
 
     def plot_sales(self, data):
-        self.sales_canvas.figure.clear()
-        ax = self.sales_canvas.figure.add_subplot(111)
-        
-        dates = list(data.keys())
-        totals = list(data.values())
-        
-        # Simple sorting by date
-        sorted_pairs = sorted(zip(dates, totals))
-        if sorted_pairs:
-            dates, totals = zip(*sorted_pairs)
-        
-        ax.bar(dates, totals, color='#4CAF50')
-        ax.set_title("Sales Trends")
-        ax.set_ylabel("Sales (₹)")
-        
-        # Rotate dates if many
-        if len(dates) > 5:
-            ax.tick_params(axis='x', rotation=45)
-            
-        self.sales_canvas.figure.tight_layout()
-        self.sales_canvas.draw()
+        dates = sorted(data)
+        self.sales_chart.set_data([d[5:] for d in dates], [to_rupees(data[d]) for d in dates])
 
     def plot_top_products(self, data):
-        self.top_prod_canvas.figure.clear()
-        ax = self.top_prod_canvas.figure.add_subplot(111)
-        
-        names = [item['name'][:15] + '..' if len(item['name']) > 15 else item['name'] for item in data]
-        qtys = [item['qty'] for item in data]
-        
-        # Invert to have top most at top
-        ax.barh(names[::-1], qtys[::-1], color='#2196F3')
-        ax.set_title("Top Selling Products")
-        ax.set_xlabel("Quantity Sold")
-        
-        self.top_prod_canvas.figure.tight_layout()
-        self.top_prod_canvas.draw()
+        self.top_prod_chart.set_data([item['name'] for item in data], [item['qty'] for item in data])
 
     def plot_payment_dist(self, data):
-        self.payment_canvas.figure.clear()
-        ax = self.payment_canvas.figure.add_subplot(111)
-        
-        labels = [d['method'] for d in data]
-        sizes = [d['total'] for d in data]
-        
-        if sizes:
-            ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=['#FFC107', '#9C27B0', '#F44336'])
-            ax.set_title("Payment Methods (By Value)")
-        else:
-            ax.text(0.5, 0.5, 'No Data', ha='center', va='center')
-            
-        self.payment_canvas.figure.tight_layout()
-        self.payment_canvas.draw()
+        self.payment_chart.set_data([d['method'] for d in data], [to_rupees(d['total']) for d in data])
+
+    def export_charts(self):
+        if self.data is None:
+            return
+        from PyQt6.QtWidgets import QFileDialog
+        filename, _ = QFileDialog.getSaveFileName(self, "Export Charts", "dashboard.png",
+                                                  "PNG Image (*.png);;PDF (*.pdf);;SVG Image (*.svg)")
+        if not filename:
+            return
+        try:
+            from app.chart_export import export_charts
+            export_charts(filename, self.data['sales'], self.data['top_products'], self.data['payments'])
+            show_info(self, "Exported", f"Charts saved to {filename}")
+        except ImportError:
+            show_error(self, "Export Charts", "Exporting charts needs matplotlib (pip install matplotlib).")
+        except Exception as e:
+            show_error(self, "Export Charts", f"Could not export charts: {e}")
@@ -1,20 +1,30 @@
 import sys
 from datetime import datetime
 from PyQt6.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
+    QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableView,
     QTableWidgetItem, QLineEdit, QLabel, QPushButton, QComboBox, 
-    QDialog, QFormLayout, QCompleter, QHeaderView, QSplitter, 
-    QListWidget, QGridLayout, QFrame, QMessageBox, QApplication
+    QDialog, QFormLayout, QHeaderView, QSplitter, 
+    QListWidget, QListWidgetItem, QGridLayout, QFrame, QMessageBox, QApplication, QInputDialog
 )
-from PyQt6.QtCore import Qt, QStringListModel, QTimer
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QAction, QKeySequence, QFont
 
+from app.db import session_scope
+from app.catalog import CatalogIndex
+from app.cart import CartModel
+from app.completer import CompletionIndex, ProductCompletions, attach_ranked_completer
+from app.scanner import SerialScannerReader, KeyboardScanFilter
 from app.models import ProductModel, CustomerModel, BillModel, SettingsModel
-from app.utils.helpers import generate_bill_number, convert_unit
+from app.utils.helpers import (
+    generate_bill_number, convert_unit, to_paise, percent_of, format_currency
+)
 from app.printer import PrinterManager
 from app.ui_settings import SettingsDialog
 from app.ui_reports import ReportsDialog
 from app.ui_error_handler import show_error, show_info
+from app.utils.exceptions import ValidationError
+from app.utils.scale_barcode import ScaleBarcodeDecoder, label_quantity
+from app.utils.logger import error_logger
 from app.ui_products import ManageProductsDialog
 from app.ui_preview import BillPreviewDialog
 
@@ -79,7 +89,7 @@ class DebtCustomersDialog(QDialog):
         debt_data = BillModel.get_debt_by_customer()
         
         total_debt = sum(d['total_debt'] for d in debt_data)
-        self.summary_label.setText(f"Total Outstanding: ₹{total_debt:.2f} from {len(debt_data)} customer(s)")
+        self.summary_label.setText(f"Total Outstanding: {format_currency(total_debt)} from {len(debt_data)} customer(s)")
         
         for row, data in enumerate(debt_data):
             self.table.insertRow(row)
@@ -87,7 +97,7 @@ class DebtCustomersDialog(QDialog):
             self.table.setItem(row, 1, QTableWidgetItem(data['customer_phone'] or '-'))
             self.table.setItem(row, 2, QTableWidgetItem(str(data['bill_count'])))
             
-            debt_item = QTableWidgetItem(f"₹{data['total_debt']:.2f}")
+            debt_item = QTableWidgetItem(format_currency(data['total_debt']))
             debt_item.setForeground(Qt.GlobalColor.red)
             self.table.setItem(row, 3, debt_item)
             
@@ -141,11 +151,15 @@ class CustomerDebtBillsDialog(QDialog):
         
         # Buttons
         btn_layout = QHBoxLayout()
+        btn_record = QPushButton("Record Payment")
+        btn_record.setStyleSheet("background-color: #2196F3; color: white;")
+        btn_record.clicked.connect(self.record_payment)
         btn_pay_all = QPushButton("Mark All as Paid")
         btn_pay_all.setStyleSheet("background-color: #4CAF50; color: white;")
         btn_pay_all.clicked.connect(self.mark_all_paid)
         btn_close = QPushButton("Close")
         btn_close.clicked.connect(self.close)
+        btn_layout.addWidget(btn_record)
         btn_layout.addWidget(btn_pay_all)
         btn_layout.addStretch()
         btn_layout.addWidget(btn_close)
@@ -157,8 +171,8 @@ class CustomerDebtBillsDialog(QDialog):
         self.table.setRowCount(0)
         bills = BillModel.get_customer_debt_bills(self.customer_id)
         
-        total = sum(b['grand_total'] for b in bills)
-        self.total_label.setText(f"Total Pending: ₹{total:.2f}")
+        self.balance = CustomerModel.get_balance(self.customer_id)
+        self.total_label.setText(f"Total Pending: {format_currency(self.balance)}")
         
         for row, bill in enumerate(bills):
             self.table.insertRow(row)
@@ -168,9 +182,10 @@ class CustomerDebtBillsDialog(QDialog):
             self.table.setItem(row, 0, bill_item)
             
             self.table.setItem(row, 1, QTableWidgetItem(bill['date_time']))
-            self.table.setItem(row, 2, QTableWidgetItem(f"₹{bill['grand_total']:.2f}"))
+            # Outstanding part only; partially paid bills say so in the status column
+            self.table.setItem(row, 2, QTableWidgetItem(format_currency(bill['grand_total'] - bill['amount_paid'])))
             
-            status_item = QTableWidgetItem("UNPAID")
+            status_item = QTableWidgetItem("PARTIAL" if bill['amount_paid'] else "UNPAID")
             status_item.setForeground(Qt.GlobalColor.red)
             self.table.setItem(row, 3, status_item)
             
@@ -190,19 +205,31 @@ class CustomerDebtBillsDialog(QDialog):
             else:
                 QMessageBox.warning(self, "Error", "Failed to update bill status")
 
+    def record_payment(self):
+        if self.balance <= 0:
+            return
+        amount, ok = QInputDialog.getDouble(self, "Record Payment", "Amount received (₹):",
+                                            self.balance / 100, 0.01, self.balance / 100, 2)
+        if ok:
+            self.apply_payment(to_paise(f"{amount:.2f}"))
+
     def mark_all_paid(self):
         reply = QMessageBox.question(self, "Confirm Payment",
                                     "Mark ALL bills as paid for this customer?",
                                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
-        if reply == QMessageBox.StandardButton.Yes:
-            bills = BillModel.get_customer_debt_bills(self.customer_id)
-            for bill in bills:
-                BillModel.mark_bill_as_paid(bill['id'])
-            self.load_bills()
+        if reply == QMessageBox.StandardButton.Yes and self.balance > 0:
+            self.apply_payment(self.balance, "Settled in full")
+
+    def apply_payment(self, amount, note=None):
+        try:
+            CustomerModel.record_payment(self.customer_id, amount, note)
+        except ValidationError as e:
+            QMessageBox.warning(self, "Error", str(e))
+        self.load_bills()
 
 
 class PaymentDialog(QDialog):
-    def __init__(self, parent=None, total=0.0):
+    def __init__(self, parent=None, total=0):
         super().__init__(parent)
         self.main_window = parent
         self.setWindowTitle("Payment")
@@ -213,10 +240,18 @@ class PaymentDialog(QDialog):
     def init_ui(self):
         layout = QVBoxLayout()
         
-        lbl_total = QLabel(f"Total to Pay: ₹{self.total:.2f}")
+        lbl_total = QLabel(f"Total to Pay: {format_currency(self.total)}")
         lbl_total.setStyleSheet("font-size: 18px; font-weight: bold;")
         layout.addWidget(lbl_total)
 
+        customer = self.main_window.current_customer if self.main_window else None
+        if customer:
+            balance = CustomerModel.get_balance(customer['id'])
+            if balance > 0:
+                lbl_balance = QLabel(f"Previous outstanding: {format_currency(balance)}")
+                lbl_balance.setStyleSheet("color: #d32f2f;")
+                layout.addWidget(lbl_balance)
+
         self.method = QComboBox()
         self.method.addItems(["Cash", "UPI", "Card", "Debt"])
         layout.addWidget(self.method)
@@ -242,7 +277,6 @@ class PaymentDialog(QDialog):
                         # Update MainWindow with new customer
                         self.main_window.current_customer = {'id': dlg.customer_id, 'name': dlg.customer_name, 'phone': dlg.customer_phone}
                         self.main_window.lbl_cust.setText(f"{dlg.customer_name}")
-                        self.main_window.load_customers()
                         self.accept()
                     else:
                         return # User cancelled customer creation
@@ -253,8 +287,6 @@ class PaymentDialog(QDialog):
         else:
             self.accept()
 
-from app.ui_dashboard import DashboardWidget
-
 class HeldBillsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -287,7 +319,7 @@ class HeldBillsDialog(QDialog):
             self.table.setItem(row, 0, QTableWidgetItem(bill['bill_number']))
             self.table.setItem(row, 1, QTableWidgetItem(bill['customer_name'] or "Walk-in"))
             self.table.setItem(row, 2, QTableWidgetItem(bill['date_time']))
-            self.table.setItem(row, 3, QTableWidgetItem(f"₹{bill['grand_total']:.2f}"))
+            self.table.setItem(row, 3, QTableWidgetItem(format_currency(bill['grand_total'])))
             self.table.item(row, 0).setData(Qt.ItemDataRole.UserRole, bill['id'])
 
     def resume_bill(self):
@@ -298,17 +330,32 @@ class HeldBillsDialog(QDialog):
             self.accept()
 
 class MainWindow(QMainWindow):
+    RECENT_BILLS = 10 # rows in the sidebar's recent bills list
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Thangam Stores Billing")
         self.resize(1200, 800)
         self.printer_manager = PrinterManager()
-        self.cart = []
+        self.cart_model = CartModel(self)
+        self.cart_model.totals_changed.connect(self.update_totals)
         self.current_customer = None
+        self.catalog = CatalogIndex()
+        self.product_completions = ProductCompletions()
+        self.customer_completions = CompletionIndex()
+        self.scale_decoder = None
+        self.load_scale_decoder()
         self.init_ui()
         self.load_products()
         self.load_customers()
         self.load_recent_bills()
+        self.scanner_reader = None
+        self.scan_filter = None
+        self.start_scanner()
+        SettingsModel.subscribe(self.on_settings_changed)
+        ProductModel.subscribe(self.on_products_changed)
+        CustomerModel.subscribe(self.on_customers_changed)
+        BillModel.subscribe(self.on_bills_changed)
 
         # Keyboard Shortcuts
         self.shortcut_f1 = QAction("Focus Search", self)
@@ -354,9 +401,19 @@ class MainWindow(QMainWindow):
         self.init_billing_tab()
         self.tabs.addTab(self.billing_tab, "Billing")
 
-        # Tab 2: Dashboard
-        self.dashboard_tab = DashboardWidget()
+        # Tab 2: Dashboard, built the first time it is shown (its queries
+        # and charts would otherwise delay the window on every start)
+        self.dashboard_tab = QWidget()
+        QVBoxLayout(self.dashboard_tab).setContentsMargins(0, 0, 0, 0)
+        self.dashboard = None
         self.tabs.addTab(self.dashboard_tab, "Dashboard")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
+
+    def on_tab_changed(self, index):
+        if self.tabs.widget(index) is self.dashboard_tab and self.dashboard is None:
+            from app.ui_dashboard import DashboardWidget
+            self.dashboard = DashboardWidget()
+            self.dashboard_tab.layout().addWidget(self.dashboard)
 
     def init_billing_tab(self):
         main_layout = QHBoxLayout(self.billing_tab)
@@ -374,11 +431,8 @@ class MainWindow(QMainWindow):
         
         self.cust_search = QLineEdit()
         self.cust_search.setPlaceholderText("🔍 Search Customer (Name/Phone)... [F1]")
-        self.cust_completer = QCompleter()
-        self.cust_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
-        self.cust_completer.setFilterMode(Qt.MatchFlag.MatchContains)
+        self.cust_completer = attach_ranked_completer(self.cust_search, self.customer_completions)
         self.cust_completer.activated.connect(self.on_customer_select)
-        self.cust_search.setCompleter(self.cust_completer)
         self.cust_search.returnPressed.connect(self.search_customer)
         btn_add_cust = QPushButton("+ New")
         btn_add_cust.setToolTip("Add New Customer")
@@ -399,10 +453,8 @@ class MainWindow(QMainWindow):
         self.prod_search = QLineEdit()
         self.prod_search.setPlaceholderText("📦 Scan Barcode or Search Product...")
         self.prod_search.setMinimumHeight(40)
-        self.prod_completer = QCompleter()
-        self.prod_completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.prod_completer = attach_ranked_completer(self.prod_search, self.product_completions)
         self.prod_completer.activated.connect(self.on_product_select)
-        self.prod_search.setCompleter(self.prod_completer)
         self.prod_search.returnPressed.connect(self.add_product_to_cart_manual)
         
         self.qty_input = QLineEdit("1")
@@ -420,13 +472,11 @@ class MainWindow(QMainWindow):
         billing_layout.addWidget(prod_group)
 
         # Cart Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["Product", "Qty", "Unit", "Price", "Total"])
+        self.table = QTableView()
+        self.table.setModel(self.cart_model)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self.table.verticalHeader().setVisible(False)
         self.table.setAlternatingRowColors(True)
-        self.table.cellChanged.connect(self.on_cart_item_changed)
         billing_layout.addWidget(self.table)
 
         # Totals
@@ -435,21 +485,21 @@ class MainWindow(QMainWindow):
         totals_layout = QFormLayout(totals_frame)
         totals_layout.setContentsMargins(20, 20, 20, 20)
         
-        self.lbl_subtotal = QLabel("0.00")
+        self.lbl_subtotal = QLabel(format_currency(0))
         self.lbl_subtotal.setAlignment(Qt.AlignmentFlag.AlignRight)
-        self.lbl_tax = QLabel("0.00")
+        self.lbl_tax = QLabel(format_currency(0))
         self.lbl_tax.setAlignment(Qt.AlignmentFlag.AlignRight)
         
         self.discount_input = QLineEdit("0")
         self.discount_input.setPlaceholderText("% [F3]")
         self.discount_input.setFixedWidth(50)
         self.discount_input.setAlignment(Qt.AlignmentFlag.AlignRight)
-        self.discount_input.textChanged.connect(self.update_cart_table)
+        self.discount_input.textChanged.connect(self.update_totals)
         
-        self.lbl_discount_amt = QLabel("0.00")
+        self.lbl_discount_amt = QLabel(format_currency(0))
         self.lbl_discount_amt.setAlignment(Qt.AlignmentFlag.AlignRight)
         
-        self.lbl_grand_total = QLabel("₹0.00")
+        self.lbl_grand_total = QLabel(format_currency(0))
         self.lbl_grand_total.setAlignment(Qt.AlignmentFlag.AlignRight)
         self.lbl_grand_total.setObjectName("lblGrandTotal")
         
@@ -562,13 +612,13 @@ class MainWindow(QMainWindow):
             show_error(self, "Empty Cart", "Cannot hold an empty bill.")
             return
 
-        grand_total = float(self.lbl_grand_total.text().replace('₹', ''))
+        subtotal, discount_amount, grand_total = self.calculate_totals()
         bill_data = {
             'bill_number': generate_bill_number(),
             'customer_id': self.current_customer['id'] if self.current_customer else None,
-            'subtotal': float(self.lbl_subtotal.text().replace('₹', '')),
+            'subtotal': subtotal,
             'grand_total': grand_total,
-            'discount_amount': float(self.lbl_discount_amt.text().replace('₹', '')),
+            'discount_amount': discount_amount,
             'date_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
         
@@ -599,53 +649,71 @@ class MainWindow(QMainWindow):
                 self.current_customer = None
                 self.lbl_cust.setText("Walk-in Customer")
                 
-            # Load Items
-            items = BillModel.get_bill_items(bill['id'])
-            self.cart = items
-            
-            # Delete the held bill to avoid dupes logic (as per plan)
-            BillModel.delete_bill(bill['id'])
+            # Load the items and delete the held bill (to avoid dupes) in one transaction
+            with session_scope() as session:
+                items = BillModel.get_bill_items(bill['id'], session=session)
+                BillModel.delete_bill(bill['id'], session=session)
             
-            self.update_cart_table()
+            self.cart_model.load(items)
             show_info(self, "Resumed", "Bill resumed successfully.")
 
     def load_products(self):
-        self.products = ProductModel.get_all_products()
-        names = [f"{p['name']} ({p['code']})" for p in self.products]
-        model = QStringListModel(names)
-        self.prod_completer.setModel(model)
+        self.catalog.load(ProductModel.get_all_products(), ProductModel.get_all_barcodes())
+        self.product_completions.load(self.catalog, BillModel.get_product_sale_days())
+
+    def on_products_changed(self, changes):
+        self.catalog.apply(changes)
+        self.product_completions.apply(self.catalog, changes)
 
     def load_customers(self):
-        self.customers = CustomerModel.get_all_customers()
-        names = [f"{c['name']} ({c['phone']})" for c in self.customers]
-        model = QStringListModel(names)
-        self.cust_completer.setModel(model)
+        bill_counts = BillModel.get_customer_bill_counts()
+        self.customer_completions.clear()
+        self.customer_completions.add_many(
+            (c['id'], f"{c['name']} ({c['phone']})", c['phone'], c['name'], bill_counts.get(c['id'], 0))
+            for c in CustomerModel.get_all_customers())
+
+    def on_customers_changed(self, changes):
+        for action, c in changes:
+            if action == 'deleted':
+                self.customer_completions.remove(c['id'])
+            else:
+                self.customer_completions.add(c['id'], f"{c['name']} ({c['phone']})", c['phone'], c['name'])
 
     def load_recent_bills(self):
         self.recent_list.clear()
-        bills = BillModel.get_recent_bills()
-        for b in bills:
-            self.recent_list.addItem(f"{b['bill_number']} - ₹{b['grand_total']:.2f}")
+        for b in BillModel.get_recent_bills(self.RECENT_BILLS):
+            self.recent_list.addItem(self.recent_bill_item(b))
+
+    def recent_bill_item(self, bill):
+        item = QListWidgetItem(f"{bill['bill_number']} - {format_currency(bill['grand_total'])}")
+        item.setData(Qt.ItemDataRole.UserRole, bill['id'])
+        return item
+
+    def on_bills_changed(self, changes):
+        # Keeps the recent list current one row at a time instead of re-querying it
+        for event, bill in changes:
+            if event == 'bill_committed':
+                self.recent_list.insertItem(0, self.recent_bill_item(bill))
+                while self.recent_list.count() > self.RECENT_BILLS:
+                    self.recent_list.takeItem(self.recent_list.count() - 1)
+            elif event == 'bill_deleted':
+                for row in range(self.recent_list.count()):
+                    if self.recent_list.item(row).data(Qt.ItemDataRole.UserRole) == bill['id']:
+                        self.recent_list.takeItem(row)
+                        break
+            elif event == 'bills_cleared':
+                self.recent_list.clear()
 
     def search_customer(self):
         query = self.cust_search.text()
-        # Try to find in loaded customers first
-        for c in self.customers:
-            if query.lower() in c['name'].lower() or query in c['phone']:
-                self.current_customer = c
-                self.lbl_cust.setText(f"{c['name']} ({c['phone']})")
-                self.cust_search.clear()
-                # Auto focus product search after resolving customer
-                self.prod_search.setFocus()
-                return
-
-        customers = CustomerModel.search_customer(query)
+        # Phone (exact, leading or last digits) or name; best match first
+        customers = CustomerModel.search_customer(query, limit=1)
         if customers:
-            # Simple selection: take first
             c = customers[0]
             self.current_customer = c
             self.lbl_cust.setText(f"{c['name']} ({c['phone']})")
             self.cust_search.clear()
+            # Auto focus product search after resolving customer
             self.prod_search.setFocus()
         else:
             show_info(self, "Not Found", "Customer not found.")
@@ -654,13 +722,12 @@ class MainWindow(QMainWindow):
         # Extract phone from "Name (Phone)"
         if '(' in text and text.endswith(')'):
             phone = text.split('(')[-1][:-1]
-            for c in self.customers:
-                if c['phone'] == phone:
-                    self.current_customer = c
-                    self.lbl_cust.setText(f"{c['name']} ({c['phone']})")
-                    self.cust_search.clear()
-                    self.prod_search.setFocus()
-                    break
+            c = CustomerModel.get_by_phone(phone)
+            if c:
+                self.current_customer = c
+                self.lbl_cust.setText(f"{c['name']} ({c['phone']})")
+                self.cust_search.clear()
+                self.prod_search.setFocus()
 
     def add_customer(self):
         dlg = ManageCustomersDialog(self)
@@ -668,154 +735,193 @@ class MainWindow(QMainWindow):
             if dlg.selected_customer:
                 self.current_customer = dlg.selected_customer
                 self.lbl_cust.setText(f"{self.current_customer['name']} ({self.current_customer['phone']})")
-            self.load_customers()
 
     def on_product_select(self, text):
-        # Extract name from "Name (Code)"
-        name = text.rsplit(' (', 1)[0]
-        for p in self.products:
-            if p['name'] == name:
-                self.add_to_cart(p)
-                self.prod_search.clear()
-                self.prod_search.setFocus()
-                break
+        p, pack_qty = self.find_completer_product(text)
+        if p:
+            self.add_to_cart(p, pack_qty)
+            self.prod_search.clear()
+            self.prod_search.setFocus()
+
+    def find_completer_product(self, text):
+        # Completer entries are "Name (Code)", where Code may be an extra barcode
+        name, _, code = text.rpartition(' (')
+        if not name or not code.endswith(')'):
+            return None, 1
+        p, pack_qty = self.catalog.lookup(code[:-1])
+        if p is None:
+            p = self.catalog.find(name)
+        return p, pack_qty
 
     def add_product_to_cart_manual(self):
         text = self.prod_search.text().strip()
         if not text:
             return
             
-        # Try to find by code/barcode first (exact match)
-        found = False
-        for p in self.products:
-            if p['code'] == text or p['name'].lower() == text.lower():
-                self.add_to_cart(p)
-                self.prod_search.clear()
-                self.qty_input.setText("1")
-                self.prod_search.setFocus()
-                found = True
-                break
-        
-        if not found:
-            # Try partial match in name or code
-            for p in self.products:
-                if text.lower() in p['name'].lower() or text.lower() in p['code'].lower():
-                    self.add_to_cart(p)
+        # Code or extra barcode, exact name, then a completer entry, straight from the in-memory index
+        p, pack_qty = self.catalog.lookup(text)
+        if p is None:
+            added = self.add_scale_label(text)
+            if added is not None:
+                if added:
                     self.prod_search.clear()
                     self.qty_input.setText("1")
                     self.prod_search.setFocus()
-                    found = True
-                    break
-        
-        if not found:
-            # Try completer logic if text matches format "Name (Code)"
-            self.on_product_select(text)
+                else:
+                    self.prod_search.selectAll()
+                return
+        if p is None:
+            p = self.catalog.find(text)
+        if p is None:
+            p, pack_qty = self.find_completer_product(text)
+        if p is None:
+            # Best partial match in name or code
+            matches = ProductModel.search_products(text, limit=1)
+            p = matches[0] if matches else None
+        if p:
+            self.add_to_cart(p, pack_qty)
+            self.prod_search.clear()
+            self.qty_input.setText("1")
+            self.prod_search.setFocus()
 
-    def add_to_cart(self, product):
+    def load_scale_decoder(self):
+        self.scale_decoder = None
+        if not SettingsModel.get_bool('scale_barcodes_enabled', False):
+            return
+        try:
+            self.scale_decoder = ScaleBarcodeDecoder.from_settings(SettingsModel.get_setting)
+        except ValueError as e:
+            error_logger.error(f"Invalid scale label settings: {e}")
+
+    def add_scale_label(self, text):
+        """
+        Add a weighed/priced pack from a scale label. Returns None if text is
+        not a scale label, False if it is one that could not be added.
+        """
+        if self.scale_decoder is None:
+            return None
+        reading = self.scale_decoder.decode(text)
+        if reading is None:
+            return None
+        p = self.catalog.find_by_plu(reading.plu)
+        if p is None:
+            show_error(self, "Unknown Item", f"No product has PLU {reading.plu}.")
+            return False
+        qty = label_quantity(reading, p['base_unit'], p['price_per_unit'])
+        if qty is None:
+            if reading.kind == 'price':
+                show_error(self, "Scale Label", f"{p['name']} has no price set, so its price label cannot be turned into a quantity.")
+            else:
+                show_error(self, "Scale Label", f"{p['name']} is not sold by weight.")
+            return False
+        # A price label's amount is what the customer pays, whatever the rounding of qty
+        total = reading.value if reading.kind == 'price' else None
+        self.add_to_cart(p, quantity=qty, total=total)
+        return True
+
+    def start_scanner(self):
+        """(Re)start scan capture for the configured scanner: a COM port reader or a keyboard burst filter"""
+        self.stop_scanner()
+        try:
+            self.scanner_reader = SerialScannerReader.from_settings(SettingsModel.get_setting, self)
+            if self.scanner_reader is None:
+                self.scan_filter = KeyboardScanFilter.from_settings(SettingsModel.get_setting, self,
+                                                                    resolves=self.is_known_code)
+        except ValueError as e:
+            error_logger.error(f"Invalid scanner settings: {e}")
+        if self.scan_filter is not None:
+            self.scan_filter.scanned.connect(self.handle_scan)
+            QApplication.instance().installEventFilter(self.scan_filter)
+        if self.scanner_reader is not None:
+            self.scanner_reader.scanned.connect(self.handle_scan, Qt.ConnectionType.QueuedConnection)
+            self.scanner_reader.failed.connect(
+                lambda message: show_error(self, "Barcode Scanner", f"Scanner stopped: {message}"))
+            self.scanner_reader.start()
+
+    def stop_scanner(self):
+        if self.scanner_reader is not None:
+            self.scanner_reader.stop()
+            self.scanner_reader = None
+        if self.scan_filter is not None:
+            QApplication.instance().removeEventFilter(self.scan_filter)
+            self.scan_filter.deleteLater()
+            self.scan_filter = None
+
+    def is_known_code(self, code):
+        """Whether handle_scan would recognise code, as a barcode or a scale label"""
+        if self.catalog.lookup(code)[0] is not None:
+            return True
+        return self.scale_decoder is not None and self.scale_decoder.decode(code) is not None
+
+    def handle_scan(self, code):
+        """
+        A complete code from a scanner. Resolved through the barcode index only,
+        so whatever the cashier is typing in the search box is left alone.
+        """
+        p, pack_qty = self.catalog.lookup(code)
+        if p is not None:
+            self.add_to_cart(p, pack_qty)
+            self.qty_input.setText("1")
+            added = True
+        else:
+            added = self.add_scale_label(code)
+            if added is None:
+                show_error(self, "Unknown Barcode", f"No product has barcode {code}.")
+        if added and SettingsModel.get_bool('scanner_beep', True):
+            QApplication.beep()
+
+    @property
+    def cart(self):
+        """The cart's item dicts, as BillModel and the receipt preview take them"""
+        return self.cart_model.items
+
+    def add_to_cart(self, product, pack_qty=1, quantity=None, total=None):
+        if quantity is not None:
+            # Each scale label is its own pack and gets its own line
+            self.cart_model.add_line(product, quantity, total)
+            return
         try:
             qty = float(self.qty_input.text())
         except ValueError:
             qty = 1.0
-        
-        # Check if product already exists in cart
-        for item in self.cart:
-            if item['product_id'] == product['id']:
-                item['quantity'] += qty
-                item['total'] = item['quantity'] * item['price']
-                self.update_cart_table()
-                return
+        # A pack barcode adds pack_qty base units per scan
+        self.cart_model.add(product, qty * pack_qty)
 
-        total = qty * product['price_per_unit']
-        
-        self.cart.append({
-            'product_id': product['id'],
-            'product_name': product['name'],
-            'quantity': qty,
-            'unit': product['base_unit'],
-            'price': product['price_per_unit'],
-            'total': total
-        })
-        self.update_cart_table()
-
-    def update_cart_table(self):
-        self.table.blockSignals(True)
-        self.table.setRowCount(len(self.cart))
-        subtotal = 0
-        for row, item in enumerate(self.cart):
-            # Product Name (Read-only)
-            name_item = QTableWidgetItem(item['product_name'])
-            name_item.setFlags(name_item.flags() ^ Qt.ItemFlag.ItemIsEditable)
-            self.table.setItem(row, 0, name_item)
-            
-            # Qty (Editable)
-            self.table.setItem(row, 1, QTableWidgetItem(str(item['quantity'])))
-            
-            # Unit (Editable - ideally ComboBox but text for now)
-            self.table.setItem(row, 2, QTableWidgetItem(item['unit']))
-            
-            # Price (Editable)
-            self.table.setItem(row, 3, QTableWidgetItem(f"{item['price']:.2f}"))
-            
-            # Total (Read-only)
-            total_item = QTableWidgetItem(f"₹{item['total']:.2f}")
-            total_item.setFlags(total_item.flags() ^ Qt.ItemFlag.ItemIsEditable)
-            self.table.setItem(row, 4, total_item)
-            
-            subtotal += item['total']
-        
-        self.lbl_subtotal.setText(f"₹{subtotal:.2f}")
-        
-        # Calculate Discount
+    def calculate_totals(self):
+        """Returns (subtotal, discount_amount, grand_total) of the cart in paise."""
+        subtotal = self.cart_model.subtotal
         try:
             disc_percent = float(self.discount_input.text())
         except ValueError:
             disc_percent = 0.0
-            
-        discount_amount = (subtotal * disc_percent) / 100
-        self.lbl_discount_amt.setText(f"₹{discount_amount:.2f}")
-        
-        grand_total = subtotal - discount_amount
-        self.lbl_grand_total.setText(f"₹{grand_total:.2f}")
-        self.table.blockSignals(False)
+        discount_amount = percent_of(subtotal, disc_percent)
+        return subtotal, discount_amount, subtotal - discount_amount
 
-    def on_cart_item_changed(self, row, column):
-        try:
-            item = self.cart[row]
-            if column == 1: # Qty
-                item['quantity'] = float(self.table.item(row, column).text())
-            elif column == 2: # Unit
-                item['unit'] = self.table.item(row, column).text()
-            elif column == 3: # Price
-                # Remove currency symbol if present
-                text = self.table.item(row, column).text().replace('₹', '')
-                item['price'] = float(text)
-            
-            # Recalculate total
-            item['total'] = item['quantity'] * item['price']
-            self.update_cart_table()
-        except ValueError:
-            pass # Ignore invalid input
+    def update_totals(self):
+        subtotal, discount_amount, grand_total = self.calculate_totals()
+        self.lbl_subtotal.setText(format_currency(subtotal))
+        self.lbl_discount_amt.setText(format_currency(discount_amount))
+        self.lbl_grand_total.setText(format_currency(grand_total))
 
     def clear_cart(self):
-        self.cart = []
+        self.cart_model.clear()
         self.current_customer = None
         self.lbl_cust.setText("Walk-in Customer")
-        self.update_cart_table()
 
     def process_bill(self):
         if not self.cart:
             show_error(self, "Empty Cart", "Add items to cart first.")
             return
 
-        grand_total = float(self.lbl_grand_total.text().replace('₹', ''))
+        subtotal, discount_amount, grand_total = self.calculate_totals()
         dlg = PaymentDialog(self, grand_total)
         if dlg.exec():
             bill_data = {
                 'bill_number': generate_bill_number(),
                 'customer_id': self.current_customer['id'] if self.current_customer else None,
-                'subtotal': float(self.lbl_subtotal.text().replace('₹', '')),
+                'subtotal': subtotal,
                 'grand_total': grand_total,
-                'discount_amount': float(self.lbl_discount_amt.text().replace('₹', '')),
+                'discount_amount': discount_amount,
                 'payment_method': dlg.payment_method,
                 'customer_name': self.current_customer['name'] if self.current_customer else "Walk-in Customer",
                 'customer_phone': self.current_customer['phone'] if self.current_customer else "",
@@ -825,26 +931,37 @@ class MainWindow(QMainWindow):
             try:
                 # Save to DB
                 BillModel.create_bill(bill_data, self.cart)
+                for product_id in {item['product_id'] for item in self.cart}:
+                    self.product_completions.record_sale(product_id)
+                if self.current_customer:
+                    self.customer_completions.bump(self.current_customer['id'])
                 
                 # Show Preview & Print
                 preview_dlg = BillPreviewDialog(self, bill_data, self.cart, self.printer_manager)
                 preview_dlg.exec()
 
                 self.clear_cart()
-                self.load_recent_bills()
-                # Dashboard might need update if active, but let's leave it to manual refresh or when tab switched
             except Exception as e:
                 show_error(self, "Error", f"Failed to process bill: {e}")
 
     def open_settings(self):
         dlg = SettingsDialog(self)
-        if dlg.exec():
-            # Reload Theme
-            from app.models import SettingsModel
+        dlg.exec()
+
+    def on_settings_changed(self, changes):
+        if 'theme' in changes or 'touch_mode' in changes:
             from app.ui_styles import get_theme_style
             theme = SettingsModel.get_setting('theme', 'Light')
-            touch_mode = SettingsModel.get_setting('touch_mode', 'false').lower() == 'true'
+            touch_mode = SettingsModel.get_bool('touch_mode', False)
             QApplication.instance().setStyleSheet(get_theme_style(theme, touch_mode))
+        if any(key.startswith('scale_') for key in changes):
+            self.load_scale_decoder()
+        if any(key in SerialScannerReader.SETTINGS for key in changes):
+            self.start_scanner()
+
+    def closeEvent(self, event):
+        self.stop_scanner()
+        super().closeEvent(event)
 
     def show_debt_customers(self):
         """Show dialog with customers who have pending debt"""
@@ -857,12 +974,12 @@ class MainWindow(QMainWindow):
                                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         if reply == QMessageBox.StandardButton.Yes:
             BillModel.delete_all_bills()
-            self.load_recent_bills()
             show_info(self, "Success", "All bill history cleared.")
 
     def open_reports(self):
         ReportsDialog(self).exec()
 
     def open_product_dialog(self):
-        ManageProductsDialog(self).exec()
-        self.load_products()
+        # Opens on the catalog already in memory; edits reach self.catalog
+        # through on_products_changed
+        ManageProductsDialog(self, self.catalog.by_id.values(), self.printer_manager).exec()
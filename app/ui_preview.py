@@ -4,6 +4,7 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt
 from app.models import SettingsModel
 from app.ui_error_handler import show_error, show_info
+from app.utils.helpers import format_paise
 import os
 
 class BillPreviewDialog(QDialog):
@@ -21,7 +22,7 @@ class BillPreviewDialog(QDialog):
 
         # Get paper settings
         paper_size = SettingsModel.get_setting('paper_size', '80mm (48 chars)')
-        chars_per_line = int(SettingsModel.get_setting('chars_per_line', '48'))
+        chars_per_line = SettingsModel.get_int('chars_per_line', 48)
         
         # Calculate preview width based on paper size
         paper_widths = {
@@ -78,7 +79,7 @@ class BillPreviewDialog(QDialog):
         footer_text = SettingsModel.get_setting('receipt_footer', 'Thank you for shopping!')
         
         # Get paper settings
-        WIDTH = int(SettingsModel.get_setting('chars_per_line', '48'))
+        WIDTH = SettingsModel.get_int('chars_per_line', 48)
         line_spacing = SettingsModel.get_setting('line_spacing', 'Normal')
         
         # Calculate column widths based on paper width
@@ -128,7 +129,7 @@ class BillPreviewDialog(QDialog):
         for item in self.items:
             name = item['product_name'][:item_col]
             qty = f"{item['quantity']}{item['unit']}"[:qty_col]
-            amt = f"{item['total']:.2f}"[:amt_col]
+            amt = format_paise(item['total'])[:amt_col]
             lines.append(f"{name:<{item_col}} {qty:^{qty_col}} {amt:>{amt_col}}")
         
         lines.append("-" * WIDTH)
@@ -138,15 +139,15 @@ class BillPreviewDialog(QDialog):
         # Calculate label and amount column widths
         label_col = WIDTH - amt_col - 2
         
-        lines.append(f"{'Subtotal':<{label_col}} Rs.{self.bill_data['subtotal']:>{amt_col-3}.2f}")
+        lines.append(f"{'Subtotal':<{label_col}} Rs.{format_paise(self.bill_data['subtotal']):>{amt_col-3}}")
         if self.bill_data.get('tax_amount') and self.bill_data['tax_amount'] > 0:
-            lines.append(f"{'Tax':<{label_col}} Rs.{self.bill_data['tax_amount']:>{amt_col-3}.2f}")
+            lines.append(f"{'Tax':<{label_col}} Rs.{format_paise(self.bill_data['tax_amount']):>{amt_col-3}}")
         if self.bill_data.get('discount_amount') and self.bill_data['discount_amount'] > 0:
-            lines.append(f"{'Discount':<{label_col}} -{self.bill_data['discount_amount']:>{amt_col-2}.2f}")
+            lines.append(f"{'Discount':<{label_col}} -{format_paise(self.bill_data['discount_amount']):>{amt_col-2}}")
         if spacing:
             lines.append(spacing)
         lines.append("=" * WIDTH)
-        lines.append(f"{'TOTAL':<{label_col}} Rs.{self.bill_data['grand_total']:>{amt_col-3}.2f}")
+        lines.append(f"{'TOTAL':<{label_col}} Rs.{format_paise(self.bill_data['grand_total']):>{amt_col-3}}")
         lines.append("=" * WIDTH)
         if spacing:
             lines.append(spacing)
@@ -263,7 +264,7 @@ class BillPreviewDialog(QDialog):
             for item in self.items:
                 name = item['product_name'][:20]
                 qty = f"{item['quantity']} {item['unit']}"
-                amt = f"Rs.{item['total']:.2f}"
+                amt = f"Rs.{format_paise(item['total'])}"
                 
                 c.drawString(left_margin, y, name)
                 c.drawCentredString(center, y, qty)
@@ -277,17 +278,17 @@ class BillPreviewDialog(QDialog):
             
             c.setFont("Helvetica", 9)
             c.drawString(left_margin, y, "Subtotal:")
-            c.drawRightString(right_margin, y, f"Rs.{self.bill_data['subtotal']:.2f}")
+            c.drawRightString(right_margin, y, f"Rs.{format_paise(self.bill_data['subtotal'])}")
             y -= 4 * mm
             
             if self.bill_data.get('tax_amount') and self.bill_data['tax_amount'] > 0:
                 c.drawString(left_margin, y, "Tax:")
-                c.drawRightString(right_margin, y, f"Rs.{self.bill_data['tax_amount']:.2f}")
+                c.drawRightString(right_margin, y, f"Rs.{format_paise(self.bill_data['tax_amount'])}")
                 y -= 4 * mm
             
             if self.bill_data.get('discount_amount') and self.bill_data['discount_amount'] > 0:
                 c.drawString(left_margin, y, "Discount:")
-                c.drawRightString(right_margin, y, f"-Rs.{self.bill_data['discount_amount']:.2f}")
+                c.drawRightString(right_margin, y, f"-Rs.{format_paise(self.bill_data['discount_amount'])}")
                 y -= 4 * mm
             
             # Grand Total
@@ -298,7 +299,7 @@ class BillPreviewDialog(QDialog):
             
             c.setFont("Helvetica-Bold", 11)
             c.drawString(left_margin, y, "TOTAL:")
-            c.drawRightString(right_margin, y, f"Rs.{self.bill_data['grand_total']:.2f}")
+            c.drawRightString(right_margin, y, f"Rs.{format_paise(self.bill_data['grand_total'])}")
             y -= 4 * mm
             c.line(left_margin, y, right_margin, y)
             y -= 6 * mm
@@ -1,13 +1,46 @@
 from PyQt6.QtWidgets import (
-    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QDialog, QVBoxLayout, QHBoxLayout, QTableView,
     QLineEdit, QPushButton, QHeaderView, QMessageBox, QFormLayout, QComboBox,
     QLabel, QSpinBox
 )
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QIntValidator
+from sqlalchemy.exc import IntegrityError
+from app.db import session_scope
 from app.models import ProductModel
 from app.printer import PrinterManager
+from app.product_table import ProductTableModel
 from app.ui_error_handler import show_error, show_info
+from app.utils.exceptions import ValidationError
+from app.utils.helpers import to_paise, format_paise
+
+def parse_barcodes(text, code=None):
+    """
+    '8901234567890, 8901234567891 x6' -> [('8901234567890', 1), ('8901234567891', 6.0)]
+    A barcode equal to code, the product's own code, is rejected.
+    """
+    barcodes = []
+    for entry in text.split(','):
+        parts = entry.split()
+        if not parts:
+            continue
+        pack_qty = 1
+        if len(parts) == 2 and parts[1].lower().startswith('x'):
+            pack_qty = float(parts[1][1:])
+            if pack_qty <= 0:
+                raise ValueError(f"Invalid pack size in '{entry.strip()}'")
+        elif len(parts) != 1:
+            raise ValueError(f"Invalid barcode entry '{entry.strip()}'")
+        if code and parts[0] == code.strip():
+            raise ValueError(f"Barcode {parts[0]} is already this product's code")
+        barcodes.append((parts[0], pack_qty))
+    return barcodes
+
+def format_barcodes(barcodes):
+    return ', '.join(
+        b['barcode'] if b['pack_qty'] == 1 else f"{b['barcode']} x{b['pack_qty']:g}"
+        for b in barcodes
+    )
 
 class ProductDialog(QDialog):
     def __init__(self, parent=None, product=None):
@@ -24,11 +57,14 @@ class ProductDialog(QDialog):
         self.unit.addItems(["kg", "g", "litre", "ml", "pc"])
         if self.product: self.unit.setCurrentText(self.product['base_unit'])
         
-        self.price = QLineEdit(str(self.product['price_per_unit']) if self.product else "")
+        self.price = QLineEdit(format_paise(self.product['price_per_unit']) if self.product else "")
         self.category = QLineEdit(self.product['category'] if self.product else "General")
+        self.barcodes = QLineEdit(format_barcodes(ProductModel.get_barcodes(self.product['id'])) if self.product else "")
+        self.barcodes.setPlaceholderText("Other barcodes, e.g. 8901234567890, 8901234567891 x6")
 
         layout.addRow("Name:", self.name)
         layout.addRow("Code:", self.code)
+        layout.addRow("Other Barcodes:", self.barcodes)
         layout.addRow("Base Unit:", self.unit)
         layout.addRow("Price:", self.price)
         layout.addRow("Category:", self.category)
@@ -40,23 +76,41 @@ class ProductDialog(QDialog):
 
     def save_product(self):
         try:
-            price = float(self.price.text())
-            if self.product:
-                ProductModel.update_product(self.product['id'], self.name.text(), self.code.text(), 
-                                          self.unit.currentText(), price, self.category.text())
-            else:
-                ProductModel.add_product(self.name.text(), self.code.text(), 
-                                       self.unit.currentText(), price, self.category.text())
-            self.accept()
+            price = to_paise(self.price.text())
         except ValueError:
             show_error(self, "Input Error", "Price must be a number.")
+            return
+        try:
+            barcodes = parse_barcodes(self.barcodes.text(), self.code.text())
+        except ValueError as e:
+            show_error(self, "Input Error", str(e))
+            return
+
+        try:
+            # Product and its barcodes are saved together or not at all
+            with session_scope() as session:
+                if self.product:
+                    product_id = self.product['id']
+                    ProductModel.update_product(product_id, self.name.text(), self.code.text(),
+                                              self.unit.currentText(), price, self.category.text(), session=session)
+                else:
+                    product_id = ProductModel.add_product(self.name.text(), self.code.text(),
+                                                        self.unit.currentText(), price, self.category.text(), session=session)
+                ProductModel.set_barcodes(product_id, barcodes, session=session)
+            self.accept()
+        except IntegrityError:
+            show_error(self, "Duplicate Barcode", "One of the barcodes already belongs to another product.")
+        except ValidationError as e:
+            show_error(self, "Duplicate Barcode", str(e))
 
 class BarcodePrintDialog(QDialog):
-    def __init__(self, parent=None, product_name="Product"):
+    def __init__(self, parent=None, product_name="Product", barcodes=None):
         super().__init__(parent)
         self.setWindowTitle("Print Labels")
         self.resize(300, 150)
         self.count = 1
+        self.barcode = None
+        self.barcodes = barcodes or []
         self.init_ui(product_name)
 
     def init_ui(self, product_name):
@@ -74,6 +128,15 @@ class BarcodePrintDialog(QDialog):
         self.spin_qty.setValue(1)
         form_layout.addWidget(self.spin_qty)
         layout.addLayout(form_layout)
+
+        # Product code by default, or one of its extra barcodes
+        self.barcode_combo = QComboBox()
+        self.barcode_combo.addItem("Product code", None)
+        for b in self.barcodes:
+            label = b['barcode'] if b['pack_qty'] == 1 else f"{b['barcode']} (pack of {b['pack_qty']:g})"
+            self.barcode_combo.addItem(label, b['barcode'])
+        self.barcode_combo.setVisible(bool(self.barcodes))
+        layout.addWidget(self.barcode_combo)
         
         btn_layout = QHBoxLayout()
         btn_print = QPushButton("🖨 Print")
@@ -89,17 +152,29 @@ class BarcodePrintDialog(QDialog):
 
     def confirm_print(self):
         self.count = self.spin_qty.value()
+        self.barcode = self.barcode_combo.currentData()
         self.accept()
 
 
 class ManageProductsDialog(QDialog):
-    def __init__(self, parent=None):
+    SEARCH_DELAY_MS = 150 # filter once typing pauses, not on every keystroke
+
+    # products and printer_manager: the caller's own, if it already holds them
+    def __init__(self, parent=None, products=None, printer_manager=None):
         super().__init__(parent)
         self.setWindowTitle("Manage Products")
         self.resize(800, 600)
-        self.printer_manager = PrinterManager()
+        self.owns_printer = printer_manager is None
+        self.printer_manager = printer_manager or PrinterManager()
+        self.model = ProductTableModel(self)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.search_products)
         self.init_ui()
-        self.load_products()
+        self.load_products(products)
+        # Saves and deletes from this dialog come back as change events
+        ProductModel.subscribe(self.model.apply)
 
     def init_ui(self):
         layout = QVBoxLayout()
@@ -108,7 +183,8 @@ class ManageProductsDialog(QDialog):
         top_layout = QHBoxLayout()
         self.search_bar = QLineEdit()
         self.search_bar.setPlaceholderText("🔍 Search by Name or Code...")
-        self.search_bar.textChanged.connect(self.search_products)
+        self.search_bar.textChanged.connect(self.search_timer.start)
+        self.search_bar.returnPressed.connect(self.search_products)
         
         btn_add = QPushButton("+ Add New Product")
         btn_add.clicked.connect(self.add_product)
@@ -118,13 +194,16 @@ class ManageProductsDialog(QDialog):
         layout.addLayout(top_layout)
 
         # Product Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["ID", "Name", "Code", "Unit", "Price", "Category"])
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.table.hideColumn(0) # Hide ID column
+        self.table.verticalHeader().setVisible(False)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.sortByColumn(ProductTableModel.NAME, Qt.SortOrder.AscendingOrder)
+        self.table.doubleClicked.connect(self.edit_product)
         layout.addWidget(self.table)
 
         # Action Buttons
@@ -147,75 +226,57 @@ class ManageProductsDialog(QDialog):
 
         self.setLayout(layout)
 
-    def load_products(self):
-        self.products = ProductModel.get_all_products()
-        self.update_table(self.products)
+    def done(self, result):
+        ProductModel.unsubscribe(self.model.apply)
+        if self.owns_printer:
+            self.printer_manager.close()
+        super().done(result)
+
+    def load_products(self, products=None):
+        self.model.load(ProductModel.get_all_products() if products is None else products)
 
     def search_products(self):
-        query = self.search_bar.text().lower()
-        filtered = [p for p in self.products if query in p['name'].lower() or query in p['code'].lower()]
-        self.update_table(filtered)
-
-    def update_table(self, products):
-        self.table.setRowCount(len(products))
-        for row, p in enumerate(products):
-            self.table.setItem(row, 0, QTableWidgetItem(str(p['id'])))
-            self.table.setItem(row, 1, QTableWidgetItem(p['name']))
-            self.table.setItem(row, 2, QTableWidgetItem(p['code']))
-            self.table.setItem(row, 3, QTableWidgetItem(p['base_unit']))
-            self.table.setItem(row, 4, QTableWidgetItem(f"{p['price_per_unit']:.2f}"))
-            self.table.setItem(row, 5, QTableWidgetItem(p['category']))
+        self.search_timer.stop()
+        self.model.set_filter(self.search_bar.text())
+
+    def selected_product(self):
+        return self.model.product(self.table.currentIndex().row())
 
     def add_product(self):
         dlg = ProductDialog(self)
         if dlg.exec():
-            self.load_products()
+            self.table.scrollToBottom() # where the model shows new products
 
     def edit_product(self):
-        row = self.table.currentRow()
-        if row < 0:
+        product = self.selected_product()
+        if not product:
             show_info(self, "Selection", "Please select a product to edit.")
             return
-        
-        product_id = int(self.table.item(row, 0).text())
-        product = next((p for p in self.products if p['id'] == product_id), None)
-        
-        if product:
-            dlg = ProductDialog(self, product)
-            if dlg.exec():
-                self.load_products()
+        ProductDialog(self, product).exec()
 
     def delete_product(self):
-        row = self.table.currentRow()
-        if row < 0:
+        product = self.selected_product()
+        if not product:
             show_info(self, "Selection", "Please select a product to delete.")
             return
         
-        product_name = self.table.item(row, 1).text()
         confirm = QMessageBox.question(self, "Confirm Delete", 
-                                     f"Are you sure you want to delete '{product_name}'?",
+                                     f"Are you sure you want to delete '{product['name']}'?",
                                      QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
         
         if confirm == QMessageBox.StandardButton.Yes:
-            product_id = int(self.table.item(row, 0).text())
-            ProductModel.delete_product(product_id)
-            self.load_products()
+            ProductModel.delete_product(product['id'])
 
     def print_label(self):
-        row = self.table.currentRow()
-        if row < 0:
+        product = self.selected_product()
+        if not product:
             show_info(self, "Selection", "Please select a product to print label.")
             return
 
-        product_id = int(self.table.item(row, 0).text())
-        # Find product in local list
-        product = next((p for p in self.products if p['id'] == product_id), None)
-        
-        if product:
-            dlg = BarcodePrintDialog(self, product['name'])
-            if dlg.exec():
-                try:
-                    self.printer_manager.print_barcode_label(product, dlg.count)
-                    show_info(self, "Success", f"Sent {dlg.count} labels to printer.")
-                except Exception as e:
-                    show_error(self, "Printing Error", str(e))
+        dlg = BarcodePrintDialog(self, product['name'], ProductModel.get_barcodes(product['id']))
+        if dlg.exec():
+            try:
+                self.printer_manager.print_barcode_label(product, dlg.count, dlg.barcode)
+                show_info(self, "Success", f"Sent {dlg.count} labels to printer.")
+            except Exception as e:
+                show_error(self, "Printing Error", str(e))
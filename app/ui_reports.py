@@ -7,6 +7,7 @@ from app.db import get_db
 from app.orm_models import Bill, Customer
 
 from app.ui_styles import TOTAL_LABEL_STYLE
+from app.utils.helpers import format_currency, to_rupees
 
 class ReportsDialog(QDialog):
     def __init__(self, parent=None):
@@ -63,14 +64,11 @@ class ReportsDialog(QDialog):
     def generate_report(self):
         start = self.start_date.date().toString("yyyy-MM-dd")
         end = self.end_date.date().toString("yyyy-MM-dd")
-        
-        # Add time to cover the full end day
-        start_ts = f"{start} 00:00:00"
-        end_ts = f"{end} 23:59:59"
 
         session = get_db()
         try:
-            bills_orm = session.query(Bill).filter(Bill.date_time.between(start_ts, end_ts)).all()
+            # business_date is indexed, and between() on whole days covers the full end day
+            bills_orm = session.query(Bill).filter(Bill.business_date.between(start, end)).all()
             self.current_bills = [b.to_dict() for b in bills_orm]
         finally:
             session.close()
@@ -83,10 +81,10 @@ class ReportsDialog(QDialog):
             self.table.setItem(row, 1, QTableWidgetItem(bill['bill_number']))
             self.table.setItem(row, 2, QTableWidgetItem(bill['customer_name'] or "Walk-in"))
             self.table.setItem(row, 3, QTableWidgetItem(bill['payment_method']))
-            self.table.setItem(row, 4, QTableWidgetItem(f"₹{bill['grand_total']:.2f}"))
+            self.table.setItem(row, 4, QTableWidgetItem(format_currency(bill['grand_total'])))
             total_sales += bill['grand_total']
 
-        self.lbl_total_sales.setText(f"Total Sales: ₹{total_sales:.2f}")
+        self.lbl_total_sales.setText(f"Total Sales: {format_currency(total_sales)}")
 
     def export_to_excel(self):
         if not hasattr(self, 'current_bills') or not self.current_bills:
@@ -108,6 +106,7 @@ class ReportsDialog(QDialog):
                 # Select and rename columns for better report
                 cols = ['date_time', 'bill_number', 'customer_name', 'payment_method', 'grand_total']
                 df = df[cols]
+                df['grand_total'] = df['grand_total'].map(to_rupees)
                 df.columns = ['Date', 'Bill No', 'Customer', 'Payment Method', 'Total']
                 
                 df.to_excel(filename, index=False)
@@ -6,7 +6,8 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import Qt
 from app.models import SettingsModel
 from app.printer import PrinterManager
-import serial.tools.list_ports
+from app.db import DB_PROFILES, DEFAULT_DB_PROFILE, session_scope
+from app.utils.scale_barcode import DEFAULT_SCALE_PREFIXES, parse_prefixes
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -148,7 +149,7 @@ class SettingsDialog(QDialog):
         
         self.chars_per_line = QSpinBox()
         self.chars_per_line.setRange(20, 80)
-        self.chars_per_line.setValue(int(SettingsModel.get_setting('chars_per_line', '48')))
+        self.chars_per_line.setValue(SettingsModel.get_int('chars_per_line', 48))
         self.chars_per_line.setSuffix(" characters")
         paper_layout.addRow("Characters/Line:", self.chars_per_line)
         
@@ -205,12 +206,28 @@ class SettingsDialog(QDialog):
         self.appearance_layout.addRow("Theme:", self.theme_combo)
         
         self.touch_mode = QCheckBox("Enable Touch Screen Mode (Larger UI)")
-        self.touch_mode.setChecked(SettingsModel.get_setting('touch_mode', 'false').lower() == 'true')
+        self.touch_mode.setChecked(SettingsModel.get_bool('touch_mode', False))
         self.appearance_layout.addRow(self.touch_mode)
         
         self.appearance_tab.setLayout(self.appearance_layout)
         self.tabs.addTab(self.appearance_tab, "Appearance")
 
+        # Database Settings
+        self.database_tab = QWidget()
+        self.database_layout = QFormLayout()
+        self.db_profile = QComboBox()
+        self.db_profile.addItems(list(DB_PROFILES.keys()))
+        self.db_profile.setCurrentText(SettingsModel.get_setting('db_profile', DEFAULT_DB_PROFILE))
+        self.database_layout.addRow("Engine Profile:", self.db_profile)
+        
+        db_profile_note = QLabel("Balanced suits most counters. Use Compatibility only if the\n"
+                                 "database lives on a network share. Applies after restart.")
+        db_profile_note.setStyleSheet("color: #666; font-style: italic;")
+        self.database_layout.addRow(db_profile_note)
+        
+        self.database_tab.setLayout(self.database_layout)
+        self.tabs.addTab(self.database_tab, "Database")
+
         # Barcode Scanner Settings
         self.scanner_tab = QWidget()
         self.scanner_layout = QVBoxLayout()
@@ -271,7 +288,7 @@ class SettingsDialog(QDialog):
         self.scanner_timeout = QSpinBox()
         self.scanner_timeout.setRange(50, 1000)
         self.scanner_timeout.setSuffix(" ms")
-        self.scanner_timeout.setValue(int(SettingsModel.get_setting('scanner_timeout', '100')))
+        self.scanner_timeout.setValue(SettingsModel.get_int('scanner_timeout', 100))
         behavior_layout.addRow("Scan Timeout:", self.scanner_timeout)
         
         behavior_group.setLayout(behavior_layout)
@@ -282,19 +299,48 @@ class SettingsDialog(QDialog):
         options_layout = QVBoxLayout()
         
         self.scanner_auto_focus = QCheckBox("Auto-focus barcode field on scan")
-        self.scanner_auto_focus.setChecked(SettingsModel.get_setting('scanner_auto_focus', 'true').lower() == 'true')
+        self.scanner_auto_focus.setChecked(SettingsModel.get_bool('scanner_auto_focus', True))
         options_layout.addWidget(self.scanner_auto_focus)
         
         self.scanner_beep = QCheckBox("Play sound on successful scan")
-        self.scanner_beep.setChecked(SettingsModel.get_setting('scanner_beep', 'true').lower() == 'true')
+        self.scanner_beep.setChecked(SettingsModel.get_bool('scanner_beep', True))
         options_layout.addWidget(self.scanner_beep)
         
         self.scanner_auto_search = QCheckBox("Auto-search product after scan")
-        self.scanner_auto_search.setChecked(SettingsModel.get_setting('scanner_auto_search', 'true').lower() == 'true')
+        self.scanner_auto_search.setChecked(SettingsModel.get_bool('scanner_auto_search', True))
         options_layout.addWidget(self.scanner_auto_search)
         
         options_group.setLayout(options_layout)
         self.scanner_layout.addWidget(options_group)
+
+        # Scale Labels Group (weight/price embedded EAN-13 from the deli scale)
+        scale_group = QGroupBox("Scale Labels")
+        scale_layout = QFormLayout()
+
+        self.scale_enabled = QCheckBox("Read weight/price from scale labels")
+        self.scale_enabled.setChecked(SettingsModel.get_bool('scale_barcodes_enabled', False))
+        scale_layout.addRow(self.scale_enabled)
+
+        self.scale_prefixes = QLineEdit(SettingsModel.get_setting('scale_prefixes', DEFAULT_SCALE_PREFIXES))
+        self.scale_prefixes.setPlaceholderText(DEFAULT_SCALE_PREFIXES)
+        scale_layout.addRow("Prefixes:", self.scale_prefixes)
+
+        self.scale_plu_digits = QSpinBox()
+        self.scale_plu_digits.setRange(4, 6)
+        self.scale_plu_digits.setValue(SettingsModel.get_int('scale_plu_digits', 5))
+        scale_layout.addRow("PLU Digits:", self.scale_plu_digits)
+
+        self.scale_verify_check = QCheckBox("Reject labels with a wrong check digit")
+        self.scale_verify_check.setChecked(SettingsModel.get_bool('scale_verify_check_digit', True))
+        scale_layout.addRow(self.scale_verify_check)
+
+        scale_note = QLabel("Weight labels carry grams (ml for liquids), price labels carry paise.\n"
+                            "The PLU is matched against the product code.")
+        scale_note.setStyleSheet("color: #666; font-style: italic;")
+        scale_layout.addRow(scale_note)
+
+        scale_group.setLayout(scale_layout)
+        self.scanner_layout.addWidget(scale_group)
         
         # Test Scanner Button
         test_layout = QHBoxLayout()
@@ -326,43 +372,56 @@ class SettingsDialog(QDialog):
             self.logo_path.setText(filename)
 
     def save_settings(self):
-        SettingsModel.set_setting('store_name', self.store_name.text())
-        SettingsModel.set_setting('store_address', self.store_address.text())
-        SettingsModel.set_setting('store_phone', self.store_phone.text())
-        SettingsModel.set_setting('header_message', self.header_message.text())
-        SettingsModel.set_setting('shop_logo_path', self.logo_path.text())
-        
-        SettingsModel.set_setting('printer_type', self.printer_type.currentText())
-        SettingsModel.set_setting('windows_printer_name', self.windows_printer_combo.currentText())
-        SettingsModel.set_setting('printer_usb_vid', self.printer_vid.text())
-        SettingsModel.set_setting('printer_usb_pid', self.printer_pid.text())
-        SettingsModel.set_setting('printer_serial_port', self.printer_port.currentText())
-        SettingsModel.set_setting('printer_ip', self.printer_ip.text())
-        
-        # Save Paper Size settings
-        SettingsModel.set_setting('paper_size', self.paper_size.currentText())
-        SettingsModel.set_setting('chars_per_line', str(self.chars_per_line.value()))
-        SettingsModel.set_setting('receipt_font_size', self.font_size.currentText())
-        SettingsModel.set_setting('line_spacing', self.line_spacing.currentText())
+        try:
+            parse_prefixes(self.scale_prefixes.text())
+        except ValueError as e:
+            QMessageBox.warning(self, "Scale Labels", f"Invalid prefixes: {e}\nExample: {DEFAULT_SCALE_PREFIXES}")
+            return
 
-        SettingsModel.set_setting('smtp_server', self.smtp_server.text())
-        SettingsModel.set_setting('smtp_port', self.smtp_port.text())
-        SettingsModel.set_setting('smtp_user', self.smtp_user.text())
-        SettingsModel.set_setting('smtp_pass', self.smtp_pass.text())
-        
-        SettingsModel.set_setting('theme', self.theme_combo.currentText())
-        SettingsModel.set_setting('touch_mode', str(self.touch_mode.isChecked()).lower())
+        # One transaction for the whole dialog instead of one per setting
+        with session_scope() as session:
+            SettingsModel.set_setting('store_name', self.store_name.text(), session=session)
+            SettingsModel.set_setting('store_address', self.store_address.text(), session=session)
+            SettingsModel.set_setting('store_phone', self.store_phone.text(), session=session)
+            SettingsModel.set_setting('header_message', self.header_message.text(), session=session)
+            SettingsModel.set_setting('shop_logo_path', self.logo_path.text(), session=session)
+        
+            SettingsModel.set_setting('printer_type', self.printer_type.currentText(), session=session)
+            SettingsModel.set_setting('windows_printer_name', self.windows_printer_combo.currentText(), session=session)
+            SettingsModel.set_setting('printer_usb_vid', self.printer_vid.text(), session=session)
+            SettingsModel.set_setting('printer_usb_pid', self.printer_pid.text(), session=session)
+            SettingsModel.set_setting('printer_serial_port', self.printer_port.currentText(), session=session)
+            SettingsModel.set_setting('printer_ip', self.printer_ip.text(), session=session)
+        
+            # Save Paper Size settings
+            SettingsModel.set_setting('paper_size', self.paper_size.currentText(), session=session)
+            SettingsModel.set_setting('chars_per_line', str(self.chars_per_line.value()), session=session)
+            SettingsModel.set_setting('receipt_font_size', self.font_size.currentText(), session=session)
+            SettingsModel.set_setting('line_spacing', self.line_spacing.currentText(), session=session)
+
+            SettingsModel.set_setting('smtp_server', self.smtp_server.text(), session=session)
+            SettingsModel.set_setting('smtp_port', self.smtp_port.text(), session=session)
+            SettingsModel.set_setting('smtp_user', self.smtp_user.text(), session=session)
+            SettingsModel.set_setting('smtp_pass', self.smtp_pass.text(), session=session)
+        
+            SettingsModel.set_setting('theme', self.theme_combo.currentText(), session=session)
+            SettingsModel.set_setting('touch_mode', str(self.touch_mode.isChecked()).lower(), session=session)
+            SettingsModel.set_setting('db_profile', self.db_profile.currentText(), session=session)
 
-        # Save Barcode Scanner settings
-        SettingsModel.set_setting('scanner_type', self.scanner_type.currentText())
-        SettingsModel.set_setting('scanner_com_port', self.scanner_com_port.currentText())
-        SettingsModel.set_setting('scanner_baud_rate', self.scanner_baud_rate.currentText())
-        SettingsModel.set_setting('scanner_prefix', self.scanner_prefix.text())
-        SettingsModel.set_setting('scanner_suffix', self.scanner_suffix.currentText())
-        SettingsModel.set_setting('scanner_timeout', str(self.scanner_timeout.value()))
-        SettingsModel.set_setting('scanner_auto_focus', str(self.scanner_auto_focus.isChecked()).lower())
-        SettingsModel.set_setting('scanner_beep', str(self.scanner_beep.isChecked()).lower())
-        SettingsModel.set_setting('scanner_auto_search', str(self.scanner_auto_search.isChecked()).lower())
+            # Save Barcode Scanner settings
+            SettingsModel.set_setting('scanner_type', self.scanner_type.currentText(), session=session)
+            SettingsModel.set_setting('scanner_com_port', self.scanner_com_port.currentText(), session=session)
+            SettingsModel.set_setting('scanner_baud_rate', self.scanner_baud_rate.currentText(), session=session)
+            SettingsModel.set_setting('scanner_prefix', self.scanner_prefix.text(), session=session)
+            SettingsModel.set_setting('scanner_suffix', self.scanner_suffix.currentText(), session=session)
+            SettingsModel.set_setting('scanner_timeout', str(self.scanner_timeout.value()), session=session)
+            SettingsModel.set_setting('scanner_auto_focus', str(self.scanner_auto_focus.isChecked()).lower(), session=session)
+            SettingsModel.set_setting('scanner_beep', str(self.scanner_beep.isChecked()).lower(), session=session)
+            SettingsModel.set_setting('scanner_auto_search', str(self.scanner_auto_search.isChecked()).lower(), session=session)
+            SettingsModel.set_setting('scale_barcodes_enabled', str(self.scale_enabled.isChecked()).lower(), session=session)
+            SettingsModel.set_setting('scale_prefixes', self.scale_prefixes.text().strip(), session=session)
+            SettingsModel.set_setting('scale_plu_digits', str(self.scale_plu_digits.value()), session=session)
+            SettingsModel.set_setting('scale_verify_check_digit', str(self.scale_verify_check.isChecked()).lower(), session=session)
 
         self.accept()
 
@@ -388,6 +447,7 @@ class SettingsDialog(QDialog):
         """Refresh the list of available COM ports"""
         self.scanner_com_port.clear()
         try:
+            import serial.tools.list_ports
             ports = serial.tools.list_ports.comports()
             for port in ports:
                 self.scanner_com_port.addItem(f"{port.device} - {port.description}", port.device)
@@ -489,6 +549,7 @@ class SettingsDialog(QDialog):
         """Refresh serial ports for printer"""
         self.printer_port.clear()
         try:
+            import serial.tools.list_ports
             ports = serial.tools.list_ports.comports()
             for port in ports:
                 self.printer_port.addItem(f"{port.device}", port.device)
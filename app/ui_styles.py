@@ -109,7 +109,7 @@ QPushButton#dangerBtn:hover {
 }
 
 /* Tables */
-QTableWidget {
+QTableView {
     background-color: white;
     border: 1px solid #dcdde1;
     gridline-color: #f5f6fa;
@@ -332,7 +332,7 @@ QPushButton#dangerBtn:hover {
 }
 
 /* Tables */
-QTableWidget {
+QTableView {
     background-color: #353b48;
     border: 1px solid #7f8fa6;
     gridline-color: #2f3640;
@@ -429,7 +429,7 @@ QPushButton {
     font-size: 18px;
 }
 
-QTableWidget {
+QTableView {
     font-size: 18px;
 }
 
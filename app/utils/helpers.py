@@ -1,13 +1,38 @@
 from datetime import datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 import random
 import string
 
+BILL_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
 def generate_bill_number():
     """Generates a unique bill number based on timestamp and random suffix."""
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=3))
     return f"BILL-{timestamp}-{suffix}"
 
+def bill_time_keys(date_time):
+    """Returns (created_ts, business_date) for a bill's local date_time string."""
+    dt = datetime.strptime(date_time, BILL_DATETIME_FORMAT)
+    return int(dt.timestamp()), dt.strftime("%Y-%m-%d")
+
+DEFAULT_COUNTRY_CODE = "91"
+
+def normalize_phone(phone, country_code=DEFAULT_COUNTRY_CODE):
+    """
+    Digits-only form of a phone number used for lookups: '+91 98765-43210',
+    '919876543210' and '09876543210' all become '9876543210'. Returns None
+    when there are no digits.
+    """
+    digits = ''.join(ch for ch in str(phone or '') if ch.isdigit())
+    if not digits:
+        return None
+    if len(digits) == 10 + len(country_code) and digits.startswith(country_code):
+        digits = digits[len(country_code):]
+    elif len(digits) == 11 and digits.startswith('0'):
+        digits = digits[1:]
+    return digits
+
 def convert_unit(value, from_unit, to_unit):
     """
     Converts units.
@@ -28,5 +53,38 @@ def convert_unit(value, from_unit, to_unit):
         
     return value
 
-def format_currency(value):
-    return f"₹{value:.2f}"
+# Money is handled as integer paise everywhere (DB, cart, receipts).
+# Rupee values only exist at the edges: user input and display.
+
+def _round_half_up(value):
+    return int(value.quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+def to_paise(rupees):
+    """Converts a rupee amount (number or text like '₹1,234.50') to integer paise."""
+    text = str(rupees).replace('₹', '').replace('Rs.', '').replace(',', '').strip()
+    try:
+        return _round_half_up(Decimal(text) * 100)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {rupees!r}")
+
+def to_rupees(paise):
+    """Converts paise to a float rupee value, for charts and spreadsheets only."""
+    return (paise or 0) / 100
+
+def line_total(quantity, price):
+    """Paise total for a quantity at a per-unit price in paise."""
+    return _round_half_up(Decimal(str(quantity)) * price)
+
+def percent_of(paise, percent):
+    """Paise share of an amount, e.g. a discount percentage."""
+    return _round_half_up(Decimal(paise) * Decimal(str(percent)) / 100)
+
+def format_paise(paise):
+    """Formats paise as a rupee amount without symbol, e.g. 12345 -> '123.45'."""
+    paise = int(paise or 0)
+    sign = '-' if paise < 0 else ''
+    rupees, rest = divmod(abs(paise), 100)
+    return f"{sign}{rupees}.{rest:02d}"
+
+def format_currency(paise):
+    return f"₹{format_paise(paise)}"
@@ -0,0 +1,93 @@
+"""
+Decoding of variable-measure EAN-13 labels printed by shop scales.
+
+Codes starting with 20-29 are reserved for in-store use. A scale label packs,
+left to right: the 2-digit prefix, the item's PLU, the weight or price, and
+the EAN check digit, e.g. with a 5-digit PLU:
+
+    21 00123 01250 C    -> PLU 00123, 1250 g
+    26 00123 08990 C    -> PLU 00123, Rs. 89.90
+
+Which prefixes carry a weight and which a price varies between scale
+vendors, so the layout comes from settings (see ScaleBarcodeDecoder.from_settings).
+"""
+from collections import namedtuple
+
+from app.utils.helpers import convert_unit
+
+# kind is 'weight' (value in g, or ml for liquids) or 'price' (value in paise)
+ScaleReading = namedtuple('ScaleReading', ['plu', 'kind', 'value'])
+
+DEFAULT_SCALE_PREFIXES = "20-24:weight, 25-29:price"
+
+def ean13_check_digit(first12):
+    """Check digit for the first 12 digits of an EAN-13."""
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+def parse_prefixes(text):
+    """'20-24:weight, 25-29:price' -> {'20': 'weight', ..., '29': 'price'}"""
+    prefixes = {}
+    for entry in text.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        span, _, kind = entry.partition(':')
+        kind = kind.strip().lower()
+        if kind not in ('weight', 'price'):
+            raise ValueError(f"Unknown scale label kind in '{entry}'")
+        start, _, end = span.strip().partition('-')
+        first, last = int(start), int(end or start)
+        if not 20 <= first <= last <= 29:
+            raise ValueError(f"Scale prefixes must be within 20-29: '{entry}'")
+        for prefix in range(first, last + 1):
+            prefixes[str(prefix)] = kind
+    return prefixes
+
+class ScaleBarcodeDecoder:
+    def __init__(self, prefixes=DEFAULT_SCALE_PREFIXES, plu_digits=5, verify_check_digit=True):
+        if not 1 <= plu_digits <= 9:
+            raise ValueError("PLU must be 1-9 digits")
+        self.prefixes = parse_prefixes(prefixes) if isinstance(prefixes, str) else dict(prefixes)
+        self.plu_digits = plu_digits
+        self.value_digits = 10 - plu_digits # 13 = prefix(2) + PLU + value + check(1)
+        self.verify_check_digit = verify_check_digit
+
+    @classmethod
+    def from_settings(cls, get_setting):
+        """Build from the scale_* settings; get_setting is SettingsModel.get_setting."""
+        return cls(
+            prefixes=get_setting('scale_prefixes', DEFAULT_SCALE_PREFIXES),
+            plu_digits=int(get_setting('scale_plu_digits', '5')),
+            verify_check_digit=get_setting('scale_verify_check_digit', 'true').lower() == 'true'
+        )
+
+    def decode(self, code):
+        """ScaleReading for a scale label, or None if code is not one."""
+        code = code.strip()
+        if len(code) != 13 or not code.isdigit():
+            return None
+        kind = self.prefixes.get(code[:2])
+        if kind is None:
+            return None
+        if self.verify_check_digit and ean13_check_digit(code[:12]) != code[12]:
+            return None
+        plu = code[2:2 + self.plu_digits]
+        value = int(code[2 + self.plu_digits:12])
+        return ScaleReading(plu, kind, value)
+
+def label_quantity(reading, base_unit, price_per_unit):
+    """
+    Cart quantity, in the product's base unit, for a decoded label.
+    Returns None if a weight label is scanned for a product not sold by
+    weight or volume, or a price label for a product without a price.
+    """
+    if reading.kind == 'weight':
+        if base_unit in ('g', 'kg'):
+            return convert_unit(reading.value, 'g', base_unit)
+        if base_unit in ('ml', 'litre'):
+            return convert_unit(reading.value, 'ml', base_unit)
+        return None
+    if price_per_unit <= 0:
+        return None
+    return round(reading.value / price_per_unit, 3)
@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Measures how long BillModel.create_bill and hold_bill take to commit bills of
+# different sizes. Runs against a scratch database, never the shop's data.
+#   python benchmark_bills.py [repeats]
+scratch_dir = tempfile.mkdtemp(prefix='thangam-bench-')
+os.environ['THANGAM_DB_PATH'] = os.path.join(scratch_dir, 'bench.db')
+
+from app.db import init_db, DB_PATH
+from app.models import ProductModel, BillModel
+from app.utils.helpers import line_total
+
+LINE_COUNTS = [5, 50, 500]
+REPEATS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+def make_items(products, count):
+    items = []
+    for i in range(count):
+        p = products[i % len(products)]
+        qty = 1 + (i % 3)
+        items.append({
+            'product_id': p['id'],
+            'product_name': p['name'],
+            'quantity': qty,
+            'unit': p['base_unit'],
+            'price': p['price_per_unit'],
+            'total': line_total(qty, p['price_per_unit'])
+        })
+    return items
+
+def make_bill_data(seq, items, payment_method='Cash'):
+    total = sum(i['total'] for i in items)
+    return {
+        'bill_number': f"BENCH-{seq:06d}",
+        'subtotal': total,
+        'grand_total': total,
+        'payment_method': payment_method,
+        'date_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+def timed_ms(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+def report(label, samples):
+    samples = sorted(samples)
+    median = samples[len(samples) // 2]
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{label:<12} median {median:8.2f} ms   p95 {p95:8.2f} ms   max {samples[-1]:8.2f} ms")
+
+print(f"Scratch database: {DB_PATH}")
+init_db()
+for n in range(200):
+    ProductModel.add_product(f"Product {n}", f"P{n:04d}", "kg", 1000 + n)
+products = ProductModel.get_all_products()
+
+seq = 0
+for count in LINE_COUNTS:
+    items = make_items(products, count)
+    print(f"\n{count} lines, {REPEATS} bills each")
+    for label, fn in (("create_bill", BillModel.create_bill), ("hold_bill", BillModel.hold_bill)):
+        samples = []
+        for _ in range(REPEATS):
+            seq += 1
+            samples.append(timed_ms(fn, make_bill_data(seq, items), items))
+        report(label, samples)
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Measures cold start: each run is a fresh Python process that imports the
+# app, opens the database and shows the main window, as run.py does. Opening
+# the dashboard tab is timed separately since it is built on first show.
+# Runs against a scratch database, never the shop's data.
+#   python benchmark_startup.py [runs]
+RUNS = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+CHILD = r"""
+import time
+start = time.perf_counter()
+import json
+from PyQt6.QtWidgets import QApplication
+from app.main import MainWindow, init_db, SettingsModel
+imported = time.perf_counter()
+init_db()
+SettingsModel.load()
+database = time.perf_counter()
+app = QApplication([])
+window = MainWindow()
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+window.tabs.setCurrentWidget(window.dashboard_tab)
+app.processEvents()
+dashboard = time.perf_counter()
+print(json.dumps({
+    'imports': imported - start,
+    'database': database - imported,
+    'window': shown - database,
+    'total': shown - start,
+    'dashboard': dashboard - shown,
+}))
+"""
+
+def run_once(env):
+    out = subprocess.run([sys.executable, '-c', CHILD], env=env, capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+scratch_dir = tempfile.mkdtemp(prefix='thangam-bench-')
+env = dict(os.environ, THANGAM_DB_PATH=os.path.join(scratch_dir, 'bench.db'))
+env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+print(f"Scratch database: {env['THANGAM_DB_PATH']}")
+
+run_once(env) # creates the database, so later runs time an existing one
+samples = [run_once(env) for _ in range(RUNS)]
+for phase in ('imports', 'database', 'window', 'total', 'dashboard'):
+    values = sorted(s[phase] * 1000 for s in samples)
+    label = 'first dashboard' if phase == 'dashboard' else phase
+    print(f"{label:<16} median {values[len(values) // 2]:8.1f} ms   max {values[-1]:8.1f} ms")
@@ -0,0 +1,10 @@
+from app.db import init_db
+from app.models import BillModel
+
+# Recomputes the dashboard rollup tables from the bills table.
+# Safe to run at any time; useful after editing bills outside the app.
+print("Initializing database...")
+init_db()
+print("Rebuilding sales rollups...")
+BillModel.rebuild_sales_rollups()
+print("Sales rollups rebuilt successfully.")
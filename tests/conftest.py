@@ -0,0 +1,12 @@
+import os
+import tempfile
+
+# app.db opens its engine on import, so point it at a scratch database first
+os.environ['THANGAM_DB_PATH'] = os.path.join(tempfile.mkdtemp(prefix='thangam-test-'), 'test.db')
+
+import pytest
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    from app.db import init_db
+    init_db()
@@ -0,0 +1,46 @@
+import pytest
+
+from app.db import session_scope
+from app.models import ProductModel, CustomerModel
+from app.utils.exceptions import ValidationError
+
+@pytest.fixture
+def product_changes():
+    received = []
+    ProductModel.subscribe(received.extend)
+    yield received
+    ProductModel.unsubscribe(received.extend)
+
+def test_failed_savepoint_keeps_outer_changes(product_changes):
+    CustomerModel.add_customer("Existing", "9000000001", "")
+    with session_scope() as session:
+        product_id = ProductModel.add_product("Rice", "EV-R1", "kg", 5000, session=session)
+        # Duplicate phone: this call's SAVEPOINT rolls back, the outer transaction goes on
+        assert CustomerModel.add_customer("Duplicate", "9000000001", "", session=session) is None
+    assert [(action, p['id']) for action, p in product_changes] == [('added', product_id)]
+
+def test_failed_savepoint_drops_its_own_changes(product_changes):
+    with session_scope() as session:
+        kept = ProductModel.add_product("Dal", "EV-D1", "kg", 9000, session=session)
+        with pytest.raises(Exception):
+            with session.begin_nested():
+                ProductModel.add_product("Sugar", "EV-S1", "kg", 4500, session=session)
+                raise RuntimeError("undo this savepoint")
+    assert [(action, p['id']) for action, p in product_changes] == [('added', kept)]
+    assert ProductModel.search_products("EV-S1") == []
+
+def test_rolled_back_transaction_publishes_nothing(product_changes):
+    with pytest.raises(RuntimeError):
+        with session_scope() as session:
+            ProductModel.add_product("Salt", "EV-T1", "kg", 2000, session=session)
+            raise RuntimeError("undo everything")
+    assert product_changes == []
+
+def test_barcode_equal_to_a_product_code_is_rejected():
+    rice = ProductModel.add_product("Basmati", "EV-B1", "kg", 12000)
+    ProductModel.add_product("Jeera", "EV-J1", "kg", 40000)
+    with pytest.raises(ValidationError):
+        ProductModel.set_barcodes(rice, [("EV-J1", 1)])
+    with pytest.raises(ValidationError):
+        ProductModel.set_barcodes(rice, [("EV-B1", 1)])
+    assert ProductModel.get_barcodes(rice) == []
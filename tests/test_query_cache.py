@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from app.models import BillModel, CustomerModel, ProductModel
+
+def debt_of(customer_id):
+    return next((d['total_debt'] for d in BillModel.get_debt_by_customer()
+                 if d['customer_id'] == customer_id), 0)
+
+def test_listener_queries_see_the_commit_they_are_told_about():
+    customer_id = CustomerModel.add_customer("Cache Debtor", "9000000101", "")
+    product_id = ProductModel.add_product("Cache Rice", "QC-R1", "kg", 6100)
+    bill_id = BillModel.create_bill({
+        'bill_number': 'QC-1', 'customer_id': customer_id, 'subtotal': 6100, 'grand_total': 6100,
+        'payment_method': 'Debt', 'date_time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }, [{'product_id': product_id, 'product_name': 'Cache Rice', 'quantity': 1,
+         'unit': 'kg', 'price': 6100, 'total': 6100}])
+    assert debt_of(customer_id) == 6100 # now cached
+
+    seen = []
+    def on_bills_changed(changes):
+        if any(event == 'bill_paid' for event, _ in changes):
+            seen.append(debt_of(customer_id))
+    BillModel.subscribe(on_bills_changed)
+    try:
+        assert BillModel.mark_bill_as_paid(bill_id)
+    finally:
+        BillModel.unsubscribe(on_bills_changed)
+    assert seen == [0]
+
+def test_repeated_queries_hit_the_cache():
+    BillModel.get_sales_trends(30)
+    hits = BillModel.analytics_cache.stats()['hits']
+    BillModel.get_sales_trends(days=30)
+    assert BillModel.analytics_cache.stats()['hits'] == hits + 1
@@ -0,0 +1,54 @@
+import os
+import pty
+import time
+
+import pytest
+
+from app.scanner import ScanFramer, SerialScannerReader
+
+def test_framer_splits_on_suffix():
+    framer = ScanFramer(suffix='\r\n')
+    assert framer.feed("8901234567890\r\n89012", now=0.0) == ['8901234567890']
+    assert framer.feed("34567891\r", now=0.01) == ['8901234567891']
+
+def test_framer_strips_prefix():
+    framer = ScanFramer(prefix=']E0', suffix='\r\n')
+    assert framer.feed("]E08901234567890\r", now=0.0) == ['8901234567890']
+
+def test_framer_flushes_after_idle_timeout():
+    framer = ScanFramer(suffix='', timeout=0.1)
+    assert framer.feed("ABC", now=0.0) == []
+    assert framer.flush_if_idle(now=0.05) == []
+    assert framer.flush_if_idle(now=0.1) == ['ABC']
+    assert framer.flush_if_idle(now=0.5) == []
+
+def test_framer_ends_quiet_code_when_next_one_starts():
+    framer = ScanFramer(suffix='', timeout=0.1)
+    framer.feed("ABC", now=0.0)
+    assert framer.feed("DEF", now=0.3) == ['ABC']
+
+def test_serial_reader_frames_codes_from_a_pty():
+    pytest.importorskip('serial')
+    QtCore = pytest.importorskip('PyQt6.QtCore')
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+
+    master, slave = pty.openpty()
+    reader = SerialScannerReader(os.ttyname(slave), suffix='\r\n', timeout_ms=100)
+    codes, errors = [], []
+    reader.scanned.connect(codes.append)
+    reader.failed.connect(errors.append)
+    reader.start()
+    try:
+        time.sleep(0.2) # let the reader open the port
+        os.write(master, b"8901234567890\r\n")
+        os.write(master, b"ABC") # no suffix: framed by the idle timeout
+        deadline = time.monotonic() + 3
+        while len(codes) < 2 and not errors and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.01)
+    finally:
+        reader.stop()
+        os.close(master)
+        os.close(slave)
+    assert errors == []
+    assert codes == ['8901234567890', 'ABC']